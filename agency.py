@@ -1,12 +1,193 @@
 import streamlit as st
-from openai import OpenAI
+from openai import OpenAI, RateLimitError, APITimeoutError, APIConnectionError, InternalServerError
+import httpx
 import os
 import json
 from datetime import datetime
 import plotly.graph_objects as go
 import plotly.express as px
-from fpdf import FPDF
+import plotly.io as pio
+import numpy as np
+import pandas as pd
+import atexit
 import base64
+import bisect
+import contextlib
+import cProfile
+import email.utils
+import hashlib
+import heapq
+import importlib.metadata
+import importlib.util
+import io
+import itertools
+import queue
+import random
+import sqlite3
+import threading
+import time
+import unicodedata
+import zlib
+from collections import Counter, OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+# Agent roles in the order their tabs are shown
+AGENT_ROLES = ["ceo", "cto", "pm", "developer", "client_manager"]
+
+AGENT_DISPLAY = {
+    "ceo": {"title": "CEO's Strategic Analysis", "label": "CEO Analysis", "waiting": "Getting CEO's analysis..."},
+    "cto": {"title": "CTO's Technical Specification", "label": "CTO Technical Specs", "waiting": "Getting CTO's technical specs..."},
+    "pm": {"title": "Product Manager's Roadmap", "label": "Product Manager Roadmap", "waiting": "Getting Product Manager's roadmap..."},
+    "developer": {"title": "Lead Developer's Implementation Plan", "label": "Developer Implementation Plan", "waiting": "Getting Developer's plan..."},
+    "client_manager": {"title": "Client Success Strategy", "label": "Client Success Strategy", "waiting": "Getting Client Success strategy..."}
+}
+
+# project_info fields each role's prompt interpolates (see build_agent_request)
+ROLE_INPUTS = {
+    "ceo": ["name", "description", "type", "budget", "timeline", "priority"],
+    "cto": ["name", "description", "type", "budget"],
+    "pm": ["name", "description", "timeline", "priority"],
+    "developer": ["name", "description", "type", "budget", "timeline"],
+    "client_manager": ["name", "description", "type", "priority"]
+}
+
+# project_info fields that appear in at least one agent prompt, in form order
+PROMPT_FIELDS = list(dict.fromkeys(field for inputs in ROLE_INPUTS.values() for field in inputs))
+
+# Roles whose finished analyses are passed into another role's prompt
+ROLE_DEPENDENCIES = {
+    "cto": ["ceo"],
+    "developer": ["pm"]
+}
+
+# Characters of each upstream analysis included in a dependent role's prompt
+UPSTREAM_CONTEXT_CHARS = 3000
+
+# Agent responses starting with this are failures and are never passed downstream
+AGENT_ERROR_PREFIX = "Error getting response"
+
+PROJECT_TYPE_OPTIONS = ["Web Application", "Mobile App", "API Development",
+                        "Data Analytics", "AI/ML Solution", "Other"]
+BUDGET_OPTIONS = ["$10k-$25k", "$25k-$50k", "$50k-$100k", "$100k+"]
+TIMELINE_OPTIONS = ["1-2 months", "3-4 months", "5-6 months", "6+ months"]
+
+# Maximum number of agent requests in flight at once
+MAX_CONCURRENT_AGENTS = int(os.getenv("AGENCY_MAX_CONCURRENCY", "5"))
+
+# Minimum seconds between re-renders of a streaming tab
+STREAM_RENDER_INTERVAL = 0.1
+
+# Shared OpenAI client connection pool settings
+OPENAI_POOL_MAX_CONNECTIONS = int(os.getenv("AGENCY_POOL_MAX_CONNECTIONS", "20"))
+OPENAI_POOL_MAX_KEEPALIVE = int(os.getenv("AGENCY_POOL_MAX_KEEPALIVE", "10"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("AGENCY_KEEPALIVE_EXPIRY", "120"))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("AGENCY_CONNECT_TIMEOUT", "10"))
+OPENAI_READ_TIMEOUT = float(os.getenv("AGENCY_READ_TIMEOUT", "120"))
+OPENAI_HTTP2 = os.getenv("AGENCY_HTTP2", "1") == "1"
+OPENAI_CLIENT_CACHE_SIZE = 64
+
+# Request scheduler: shared rate limits, retries and per-role timeouts
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("AGENCY_RPM_LIMIT", "500"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("AGENCY_TPM_LIMIT", "200000"))
+LLM_MAX_RETRIES = int(os.getenv("AGENCY_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE = 1.0
+LLM_BACKOFF_MAX = 30.0
+LLM_TIMEOUTS = {
+    "ceo": 90, "cto": 90, "pm": 90, "developer": 120, "client_manager": 90,
+    "chat": 60, "summary": 30, "suggest": 15
+}
+
+# Priority lanes, lower runs first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_ANALYSIS = 1
+PRIORITY_BATCH = 2
+
+# Persistent response cache location and limits
+RESPONSE_CACHE_PATH = os.getenv("AGENCY_CACHE_PATH", os.path.join(".agency_cache", "responses.sqlite3"))
+RESPONSE_CACHE_TTL = int(os.getenv("AGENCY_CACHE_TTL", str(7 * 24 * 3600)))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("AGENCY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Persistent project history
+AGENCY_DATA_DIR = os.getenv("AGENCY_DATA_DIR", ".agency_data")
+PROJECT_STORE_PATH = os.getenv("AGENCY_PROJECTS_DB", os.path.join(AGENCY_DATA_DIR, "projects.sqlite3"))
+COMPARISON_PROJECT_LIMIT = 200
+# Per-owner sidebar aggregates kept in memory (server mode); evicted owners are reloaded on their next rerun
+OWNER_ANALYTICS_LIMIT = 1024
+
+# Per-call LLM telemetry: tokens, latency, cost, cache hits, retries and errors
+TELEMETRY_DB_PATH = os.getenv("AGENCY_TELEMETRY_DB", os.path.join(AGENCY_DATA_DIR, "telemetry.sqlite3"))
+# Per-call rows kept (oldest pruned first); all-time totals are kept separately and never pruned
+TELEMETRY_MAX_ROWS = int(os.getenv("AGENCY_TELEMETRY_MAX_ROWS", "100000"))
+# Most recent calls the all-session latency percentiles are taken over
+TELEMETRY_LATENCY_WINDOW = 1000
+# Ask streaming endpoints for a final usage chunk (token counts are estimated when it is missing)
+LLM_STREAM_USAGE = os.getenv("AGENCY_STREAM_USAGE", "1") == "1"
+# USD per million prompt / completion tokens
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00)
+}
+
+# Generated export files kept in memory, optionally spilling evicted files to disk
+EXPORT_CACHE_MAX_BYTES = int(os.getenv("AGENCY_EXPORT_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+EXPORT_SPILL_DIR = os.getenv("AGENCY_EXPORT_SPILL_DIR")
+
+# Background export jobs for full PDF reports
+EXPORT_WORKERS = int(os.getenv("AGENCY_EXPORT_WORKERS", "2"))
+EXPORT_JOB_DIR = os.getenv("AGENCY_EXPORT_JOB_DIR", os.path.join(AGENCY_DATA_DIR, "exports"))
+EXPORT_JOB_HISTORY = 20
+EXPORT_JOB_POLL_SECONDS = 2
+HISTORY_EXPORT_LIMIT = 50
+
+# Rendered chart images for exports, kept in memory and shared between processes on disk
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("AGENCY_IMAGE_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+IMAGE_CACHE_DIR = os.getenv("AGENCY_IMAGE_CACHE_DIR", os.path.join(AGENCY_DATA_DIR, "images"))
+CHART_IMAGE_WIDTH = 1000
+CHART_IMAGE_HEIGHT = 500
+# Markdown downloads are a single file, so charts there can only be embedded as base64 data URIs
+MARKDOWN_EMBED_CHARTS = os.getenv("AGENCY_MARKDOWN_CHARTS", "0") == "1"
+
+# TrueType fonts embedded in PDF exports for full Unicode text (built-in Helvetica when unset)
+PDF_FONT_PATH = os.getenv("AGENCY_PDF_FONT")
+PDF_BOLD_FONT_PATH = os.getenv("AGENCY_PDF_BOLD_FONT")
+
+# Success-score rules config (JSON, or YAML when PyYAML is installed)
+SCORING_RULES_PATH = os.getenv("AGENCY_SCORING_RULES",
+                               os.path.join(os.path.dirname(os.path.abspath(__file__)), "scoring_rules.json"))
+SCORING_LOOKUP_MAX_ENTRIES = 4096
+RESCORE_CHUNK_SIZE = 10000
+
+# Dashboard figures cached per input value, optionally serialized to disk
+FIGURE_CACHE_DIR = os.getenv("AGENCY_FIGURE_CACHE_DIR")
+FIGURE_CACHE_VERSION = "1"
+SCORE_FIGURE_CACHE_SIZE = 128
+
+# Chat memory: recent turns sent verbatim within a token budget, older turns summarized
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("AGENCY_CHAT_TOKEN_BUDGET", "2000"))
+CHAT_RECENT_TURNS = 6
+CHAT_TURNS_KEPT_AFTER_SUMMARY = 3
+CHAT_SUMMARY_MAX_TOKENS = 300
+CHAT_ANALYSIS_TOKEN_LIMIT = 1200
+
+# Opt-in rerun profiling: AGENCY_PROFILE or ?profile= set to 1 (timing spans), cprofile or pyinstrument (plus dumps)
+PROFILE_MODE = os.getenv("AGENCY_PROFILE", "")
+PROFILE_DIR = os.getenv("AGENCY_PROFILE_DIR", os.path.join(AGENCY_DATA_DIR, "profiles"))
+PROFILE_DUMPS_KEPT = 50
+PROFILE_RERUNS_KEPT = 20
+
+# AI wizard suggestions memoized per normalized description
+SUGGESTION_CACHE_SIZE = 512
+SUGGESTION_CACHE_TTL = 24 * 3600
+
+# Multi-user server mode: caches, clients and the scheduler stay process-wide, history and exports are per user
+SERVER_MODE = os.getenv("AGENCY_SERVER_MODE", "0") == "1"
+# Request header carrying the signed-in user from an auth proxy; without it users are told apart by API key
+SERVER_USER_HEADER = os.getenv("AGENCY_USER_HEADER")
+# Per-session memory bounds: open chat conversations, turns held per conversation and "What Changed" logs
+SESSION_CHAT_LIMIT = int(os.getenv("AGENCY_SESSION_CHATS", "10"))
+CHAT_TURNS_KEPT = int(os.getenv("AGENCY_CHAT_TURNS_KEPT", "30"))
+SESSION_CHANGE_LOG_LIMIT = 10
 
 def init_session_state():
     """Initialize session state variables"""
@@ -14,14 +195,450 @@ def init_session_state():
         st.session_state.messages = []
     if 'api_key' not in st.session_state:
         st.session_state.api_key = None
-    if 'project_history' not in st.session_state:
-        st.session_state.project_history = []
+    if 'last_project_id' not in st.session_state:
+        st.session_state.last_project_id = None
     if 'current_analysis' not in st.session_state:
         st.session_state.current_analysis = {}
     if 'chat_mode' not in st.session_state:
         st.session_state.chat_mode = False
     if 'chat_history' not in st.session_state:
         st.session_state.chat_history = {}
+    if 'stream_responses' not in st.session_state:
+        st.session_state.stream_responses = True
+    if 'show_diagnostics' not in st.session_state:
+        st.session_state.show_diagnostics = False
+    if 'agent_timings' not in st.session_state:
+        st.session_state.agent_timings = {}
+    if 'analysis_changes' not in st.session_state:
+        st.session_state.analysis_changes = {}
+    if 'cache_mode' not in st.session_state:
+        st.session_state.cache_mode = "use"
+
+# ============ MULTI-USER SERVER MODE ============
+def current_user_id():
+    """Owner of this session's history and exports in server mode, None when running single-user"""
+    if not SERVER_MODE:
+        return None
+    if SERVER_USER_HEADER:
+        user = st.context.headers.get(SERVER_USER_HEADER)
+        if user:
+            return f"user:{user}"
+    return api_key_owner(st.session_state.get('api_key') or "")
+
+def api_key_owner(api_key):
+    """Owner id of a user known only by their API key; only a digest of the key is kept"""
+    return "key:" + hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+def remember(mapping, key, value, limit):
+    """Store `value` as the newest entry of a session-state dict, dropping the oldest entries beyond `limit`"""
+    mapping.pop(key, None)
+    mapping[key] = value
+    while len(mapping) > limit:
+        del mapping[next(iter(mapping))]
+    return value
+
+# ============ SHARED OPENAI CLIENT POOL ============
+@st.cache_resource(max_entries=OPENAI_CLIENT_CACHE_SIZE, show_spinner=False)
+def get_openai_client(api_key, base_url=None):
+    """Shared OpenAI client per API key, keeping pooled HTTP connections alive across reruns"""
+    http_client = httpx.Client(
+        http2=OPENAI_HTTP2 and importlib.util.find_spec("h2") is not None,
+        limits=httpx.Limits(
+            max_connections=OPENAI_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(OPENAI_READ_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT)
+    )
+    # Retries are handled by the request scheduler so they respect the shared rate limits
+    return OpenAI(api_key=api_key, base_url=base_url, http_client=http_client, max_retries=0)
+
+# ============ LLM TELEMETRY ============
+def current_session_id():
+    """Streamlit session of the running script, or None outside a session (batch runs, worker threads)"""
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx else None
+
+class LLMTelemetry:
+    """SQLite log of every LLM call (and response-cache hit) with per-session and per-kind rollups"""
+
+    def __init__(self, path, prices=MODEL_PRICES, max_rows=TELEMETRY_MAX_ROWS):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.prices = prices
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Losing the last few records on a crash is fine; an fsync per LLM call is not needed
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS llm_calls (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at REAL NOT NULL,
+                session_id TEXT,
+                kind TEXT NOT NULL,
+                model TEXT,
+                streamed INTEGER NOT NULL DEFAULT 0,
+                cache_hit INTEGER NOT NULL DEFAULT 0,
+                latency REAL,
+                ttft REAL,
+                wait REAL,
+                retries INTEGER NOT NULL DEFAULT 0,
+                prompt_tokens INTEGER NOT NULL DEFAULT 0,
+                completion_tokens INTEGER NOT NULL DEFAULT 0,
+                usage_estimated INTEGER NOT NULL DEFAULT 0,
+                cost REAL NOT NULL DEFAULT 0,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_llm_calls_session ON llm_calls (session_id, created_at);
+            CREATE INDEX IF NOT EXISTS idx_llm_calls_created ON llm_calls (created_at);
+            CREATE TABLE IF NOT EXISTS llm_totals (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                calls INTEGER NOT NULL DEFAULT 0,
+                cache_hits INTEGER NOT NULL DEFAULT 0,
+                errors INTEGER NOT NULL DEFAULT 0,
+                retries INTEGER NOT NULL DEFAULT 0,
+                prompt_tokens INTEGER NOT NULL DEFAULT 0,
+                completion_tokens INTEGER NOT NULL DEFAULT 0,
+                cost REAL NOT NULL DEFAULT 0
+            );
+        """)
+        # Databases created before totals were kept start from the calls already logged
+        self._conn.execute("""
+            INSERT OR IGNORE INTO llm_totals
+            SELECT 1, COUNT(*), COALESCE(SUM(cache_hit), 0), COUNT(error), COALESCE(SUM(retries), 0),
+                   COALESCE(SUM(prompt_tokens), 0), COALESCE(SUM(completion_tokens), 0), COALESCE(SUM(cost), 0)
+            FROM llm_calls""")
+
+    def cost(self, model, prompt_tokens, completion_tokens):
+        """USD cost of a call; unknown models are priced at zero"""
+        prompt_price, completion_price = self.prices.get(model, (0.0, 0.0))
+        return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+    def record(self, kind, model, latency=None, ttft=None, wait=None, retries=0, prompt_tokens=0,
+               completion_tokens=0, usage_estimated=False, streamed=False, cache_hit=False, error=None,
+               session_id=None):
+        cost = 0.0 if cache_hit else self.cost(model, prompt_tokens, completion_tokens)
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            cursor = self._conn.execute(
+                "INSERT INTO llm_calls (created_at, session_id, kind, model, streamed, cache_hit, latency, ttft, wait, "
+                "retries, prompt_tokens, completion_tokens, usage_estimated, cost, error) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), session_id, kind, model, int(streamed), int(cache_hit), latency, ttft, wait,
+                 retries, prompt_tokens, completion_tokens, int(usage_estimated), cost, error)
+            )
+            self._conn.execute(
+                "UPDATE llm_totals SET calls = calls + 1, cache_hits = cache_hits + ?, errors = errors + ?, "
+                "retries = retries + ?, prompt_tokens = prompt_tokens + ?, "
+                "completion_tokens = completion_tokens + ?, cost = cost + ? WHERE id = 1",
+                (int(cache_hit), int(error is not None), retries, prompt_tokens, completion_tokens, cost)
+            )
+            # Ids only grow, so the oldest rows are a cheap primary-key range
+            if cursor.lastrowid > self.max_rows:
+                self._conn.execute("DELETE FROM llm_calls WHERE id <= ?", (cursor.lastrowid - self.max_rows,))
+
+    def record_cache_hit(self, kind, request):
+        """A response served from the response cache instead of the model"""
+        self.record(kind, request["model"], cache_hit=True, session_id=current_session_id())
+
+    def summary(self, session_id=None):
+        """Totals and latency percentiles for one session, or for every call when session_id is None.
+
+        The every-call totals come from the running totals; its percentiles cover the most recent calls only.
+        """
+        with self._lock:
+            if session_id:
+                row = self._conn.execute("""
+                    SELECT COUNT(*), COALESCE(SUM(cache_hit), 0), COUNT(error),
+                           COALESCE(SUM(retries), 0), COALESCE(SUM(prompt_tokens), 0),
+                           COALESCE(SUM(completion_tokens), 0), COALESCE(SUM(cost), 0)
+                    FROM llm_calls WHERE session_id = ?""", (session_id,)).fetchone()
+                latencies = [r[0] for r in self._conn.execute(
+                    "SELECT latency FROM llm_calls WHERE session_id = ? "
+                    "AND cache_hit = 0 AND error IS NULL AND latency IS NOT NULL", (session_id,))]
+            else:
+                row = self._conn.execute(
+                    "SELECT calls, cache_hits, errors, retries, prompt_tokens, completion_tokens, cost "
+                    "FROM llm_totals WHERE id = 1").fetchone()
+                latencies = [r[0] for r in self._conn.execute(
+                    "SELECT latency FROM (SELECT latency, cache_hit, error FROM llm_calls ORDER BY id DESC LIMIT ?) "
+                    "WHERE cache_hit = 0 AND error IS NULL AND latency IS NOT NULL", (TELEMETRY_LATENCY_WINDOW,))]
+        calls, cache_hits, errors, retries, prompt_tokens, completion_tokens, cost = row
+        latencies.sort()
+        return {
+            "calls": calls,
+            "cache_hits": cache_hits,
+            "errors": errors,
+            "retries": retries,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cost": cost,
+            "latency_p50": latencies[len(latencies) // 2] if latencies else None,
+            "latency_p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else None
+        }
+
+    def by_kind(self, session_id=None):
+        """Per role/kind rollup rows: kind, calls, cache hits, errors, tokens, cost and average latency/TTFT"""
+        where, params = ("WHERE session_id = ?", (session_id,)) if session_id else ("", ())
+        with self._lock:
+            rows = self._conn.execute(f"""
+                SELECT kind, COUNT(*), SUM(cache_hit), COUNT(error), SUM(prompt_tokens), SUM(completion_tokens),
+                       SUM(cost), AVG(CASE WHEN cache_hit = 0 THEN latency END), AVG(ttft)
+                FROM llm_calls {where} GROUP BY kind ORDER BY SUM(cost) DESC, kind""", params).fetchall()
+        columns = ["kind", "calls", "cache_hits", "errors", "prompt_tokens", "completion_tokens",
+                   "cost", "avg_latency", "avg_ttft"]
+        return [dict(zip(columns, row)) for row in rows]
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM llm_calls")
+            self._conn.execute("UPDATE llm_totals SET calls = 0, cache_hits = 0, errors = 0, retries = 0, "
+                               "prompt_tokens = 0, completion_tokens = 0, cost = 0 WHERE id = 1")
+
+@st.cache_resource
+def get_llm_telemetry():
+    """Shared LLM telemetry sink for this process"""
+    return LLMTelemetry(TELEMETRY_DB_PATH)
+
+def show_llm_usage():
+    """Sidebar panel with this session's LLM calls, tokens, cost and latency"""
+    telemetry = get_llm_telemetry()
+    session_id = current_session_id()
+    usage = telemetry.summary(session_id)
+    
+    if not usage['calls']:
+        st.info("📈 Token and cost usage will appear after your first AI request")
+        return
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("LLM Calls", usage['calls'])
+        st.metric("Tokens", f"{usage['prompt_tokens'] + usage['completion_tokens']:,}")
+    with col2:
+        st.metric("Cost", f"${usage['cost']:.4f}")
+        st.metric("p95 Latency", f"{usage['latency_p95']:.1f}s" if usage['latency_p95'] is not None else "–")
+    st.caption(f"{usage['prompt_tokens']:,} prompt / {usage['completion_tokens']:,} completion tokens • "
+               f"{usage['cache_hits']} cache hits • {usage['retries']} retries • {usage['errors']} errors")
+    
+    with st.expander("Per-agent breakdown"):
+        breakdown = pd.DataFrame(telemetry.by_kind(session_id))
+        st.dataframe(breakdown.round({"cost": 5, "avg_latency": 2, "avg_ttft": 2}), hide_index=True,
+                     use_container_width=True)
+    
+    if SERVER_MODE:
+        return
+    totals = telemetry.summary()
+    st.caption(f"All sessions: {totals['calls']:,} calls • "
+               f"{totals['prompt_tokens'] + totals['completion_tokens']:,} tokens • ${totals['cost']:.2f}")
+
+# ============ REQUEST SCHEDULER ============
+class TokenBucket:
+    """Token bucket refilled continuously at `rate_per_minute`"""
+
+    def __init__(self, rate_per_minute):
+        self.capacity = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` can be taken (requests larger than the bucket wait for a full bucket)"""
+        self._refill(now)
+        needed = min(amount, self.capacity) - self.tokens
+        return max(0.0, needed / self.rate)
+
+    def consume(self, amount):
+        self.tokens -= min(amount, self.capacity)
+
+    def drain(self):
+        self.tokens = 0.0
+
+def estimate_prompt_tokens(request):
+    """Rough prompt size of a request at ~4 characters per token"""
+    return sum(len(str(message.get("content", ""))) for message in request.get("messages", [])) // 4
+
+def estimate_request_tokens(request):
+    """Rough token cost of a request: the estimated prompt plus the completion budget"""
+    return estimate_prompt_tokens(request) + request.get("max_tokens", 0)
+
+def _retry_after_seconds(error):
+    """Server-suggested delay from Retry-After headers, if any"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    # Each header is parsed on its own, so a malformed one falls through to the other
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+    except ValueError:
+        pass
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(retry_after)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class RequestScheduler:
+    """Central gate for every LLM call.
+
+    Requests wait in priority order for both a requests/min and a tokens/min bucket,
+    then run with a per-role timeout. Rate limits, timeouts, connection errors and 5xx
+    responses are retried with exponential backoff and jitter, honouring Retry-After.
+    A 429 pauses every lane so the whole process backs off together.
+    """
+
+    RETRYABLE_ERRORS = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+
+    def __init__(self, requests_per_minute=LLM_REQUESTS_PER_MINUTE, tokens_per_minute=LLM_TOKENS_PER_MINUTE,
+                 max_retries=LLM_MAX_RETRIES, telemetry=None):
+        self.telemetry = telemetry
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._paused_until = 0.0
+
+    def _acquire(self, priority, tokens):
+        with self._cond:
+            ticket = (priority, next(self._sequence))
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    if self._waiting[0] == ticket:
+                        now = time.monotonic()
+                        wait = max(
+                            self._paused_until - now,
+                            self.request_bucket.wait_time(1, now),
+                            self.token_bucket.wait_time(tokens, now)
+                        )
+                        if wait <= 0:
+                            self.request_bucket.consume(1)
+                            self.token_bucket.consume(tokens)
+                            return
+                        self._cond.wait(wait)
+                    else:
+                        self._cond.wait()
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+
+    def _pause(self, seconds):
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self.request_bucket.drain()
+            self._cond.notify_all()
+
+    def _backoff(self, error, attempt):
+        retry_after = _retry_after_seconds(error)
+        if retry_after is not None:
+            return min(retry_after, LLM_BACKOFF_MAX)
+        delay = min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def create(self, client, request, kind, priority=PRIORITY_ANALYSIS, stream=False):
+        """Run client.chat.completions.create(**request) under the shared limits.
+
+        `kind` is the agent role, "chat", "summary" or "suggest" and selects the timeout. For
+        streams only opening the stream is retried; errors part-way through reach the caller.
+        Each call is recorded in the telemetry sink once it completes or finally fails.
+        """
+        tokens = estimate_request_tokens(request)
+        timeout = LLM_TIMEOUTS.get(kind, OPENAI_READ_TIMEOUT)
+        if stream and LLM_STREAM_USAGE:
+            request = {**request, "stream_options": {"include_usage": True}}
+        call = {"kind": kind, "model": request.get("model"), "streamed": stream, "session_id": current_session_id()}
+        started = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            self._acquire(priority, tokens)
+            call_started = time.perf_counter()
+            call["wait"] = call_started - started
+            call["retries"] = attempt
+            try:
+                if stream:
+                    response = client.chat.completions.create(stream=True, timeout=timeout, **request)
+                else:
+                    response = client.chat.completions.create(timeout=timeout, **request)
+            except self.RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    self._record(call, request, call_started, error=e)
+                    raise
+                delay = self._backoff(e, attempt)
+                if isinstance(e, RateLimitError):
+                    self._pause(delay)
+                time.sleep(delay)
+            except Exception as e:
+                self._record(call, request, call_started, error=e)
+                raise
+            else:
+                if stream:
+                    return self._metered_stream(response, call, request, call_started)
+                self._record(call, request, call_started, usage=response.usage)
+                return response
+
+    def _metered_stream(self, stream, call, request, call_started):
+        """Pass stream chunks through, recording TTFT, usage and errors when the stream ends"""
+        ttft = None
+        usage = None
+        chars = 0
+        error = None
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if ttft is None:
+                        ttft = time.perf_counter() - call_started
+                    chars += len(chunk.choices[0].delta.content)
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage
+                yield chunk
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._record(call, request, call_started, usage=usage, ttft=ttft, completion_chars=chars, error=error)
+
+    def _record(self, call, request, call_started, usage=None, ttft=None, completion_chars=0, error=None):
+        if self.telemetry is None:
+            return
+        if usage is not None:
+            prompt_tokens, completion_tokens = usage.prompt_tokens or 0, usage.completion_tokens or 0
+        else:
+            prompt_tokens, completion_tokens = estimate_prompt_tokens(request), completion_chars // 4
+        try:
+            self.telemetry.record(
+                latency=time.perf_counter() - call_started,
+                ttft=ttft,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                usage_estimated=usage is None and error is None,
+                error=type(error).__name__ if error is not None else None,
+                **call
+            )
+        except sqlite3.Error:
+            # Telemetry must never fail the call it describes
+            pass
+
+@st.cache_resource
+def get_request_scheduler():
+    """Shared request scheduler for this process"""
+    return RequestScheduler(telemetry=get_llm_telemetry())
 
 # ============ NEW FEATURE 1: INDUSTRY TEMPLATES ============
 def get_industry_templates():
@@ -120,124 +737,175 @@ def get_industry_templates():
     }
 
 # ============ NEW FEATURE 2: SUCCESS SCORE CALCULATOR ============
-def calculate_success_score(project_info):
+# ============ SCORING RULES ============
+class ScoringRules:
+    """Success-score rules loaded from config and compiled into lookup tables and threshold arrays.
+
+    "exact" and "contains" categories score a field value with one dict lookup. The tables are
+    pre-filled from the rule values and each category's expected "domain"; other values are
+    matched once (first rule contained in the value, for "contains") and memoized.
+    "word_count" categories and the success levels use sorted threshold arrays.
+    """
+
+    def __init__(self, config):
+        self.version = str(config['version'])
+        self.categories = []
+        for category in config['categories']:
+            compiled = {
+                'name': category['name'],
+                'field': category['field'],
+                'max': category['max'],
+                'match': category.get('match', 'exact'),
+                'missing': category.get('missing', ''),
+                'rules': category['rules'],
+                'default': (category['default']['score'], category['default']['reason'])
+            }
+            if compiled['match'] == 'word_count':
+                ordered = sorted(category['rules'], key=lambda rule: rule['above'])
+                compiled['bounds'] = [rule['above'] for rule in ordered]
+                compiled['scores'] = [compiled['default'][0]] + [rule['score'] for rule in ordered]
+                compiled['reasons'] = [compiled['default'][1]] + [rule['reason'] for rule in ordered]
+            elif compiled['match'] in ('exact', 'contains'):
+                compiled['table'] = {}
+                for value in [rule['value'] for rule in category['rules']] + category.get('domain', []):
+                    compiled['table'][value] = self._match(compiled, value)
+            else:
+                raise ValueError(f"Unknown match type {compiled['match']!r} for {category['name']}")
+            self.categories.append(compiled)
+        
+        default_level = next(level for level in config['levels'] if 'min_score' not in level)
+        ordered = sorted((level for level in config['levels'] if 'min_score' in level), key=lambda level: level['min_score'])
+        self.level_bounds = [level['min_score'] for level in ordered]
+        self.levels = [default_level] + ordered
+        self.category_names = [category['name'] for category in self.categories]
+
+    @classmethod
+    def load(cls, path=SCORING_RULES_PATH):
+        with open(path, encoding="utf-8") as f:
+            if path.endswith((".yaml", ".yml")):
+                if importlib.util.find_spec("yaml") is None:
+                    raise ValueError(f"PyYAML is required to read {path}")
+                import yaml
+                return cls(yaml.safe_load(f))
+            return cls(json.load(f))
+
+    @staticmethod
+    def field_value(category, project_info):
+        """A project's value for a category; None and NaN count as absent, as they do in batch columns"""
+        value = project_info.get(category['field'])
+        if value is None or value is pd.NA or (isinstance(value, float) and np.isnan(value)):
+            return category['missing']
+        return value
+
+    @staticmethod
+    def _match(category, value):
+        """Evaluate a category's rules for one value (only run on a lookup-table miss)"""
+        for rule in category['rules']:
+            if value == rule['value'] or (category['match'] == 'contains' and isinstance(value, str)
+                                          and rule['value'] in value):
+                return rule['score'], rule['reason'].format(value=value)
+        return category['default'][0], category['default'][1].format(value=value)
+
+    def lookup(self, category, value):
+        """(score, reason) for a field value of an "exact" or "contains" category"""
+        table = category['table']
+        result = table.get(value)
+        if result is None:
+            result = self._match(category, value)
+            if len(table) < SCORING_LOOKUP_MAX_ENTRIES:
+                table[value] = result
+        return result
+
+    def word_count_index(self, category, words):
+        return bisect.bisect_left(category['bounds'], words)
+
+    def level_for(self, score):
+        return self.levels[bisect.bisect_right(self.level_bounds, score)]
+
+    def score(self, project_info):
+        """Score one project_info dict"""
+        score = 0
+        breakdown = {}
+        for category in self.categories:
+            value = self.field_value(category, project_info)
+            if category['match'] == 'word_count':
+                idx = self.word_count_index(category, len(value.split()) if isinstance(value, str) else 0)
+                points, reason = category['scores'][idx], category['reasons'][idx]
+            else:
+                points, reason = self.lookup(category, value)
+            breakdown[category['name']] = {'score': points, 'max': category['max'], 'reason': reason}
+            score += points
+        
+        success_level = self.level_for(score)
+        return {
+            'total_score': score,
+            'level': success_level['level'],
+            'color': success_level['color'],
+            'emoji': success_level['emoji'],
+            'advice': success_level['advice'],
+            'breakdown': breakdown,
+            'rules_version': self.version
+        }
+
+@st.cache_resource
+def get_scoring_rules():
+    """Scoring rules compiled once per process from SCORING_RULES_PATH"""
+    return ScoringRules.load(SCORING_RULES_PATH)
+
+def calculate_success_score(project_info, rules=None):
     """Calculate project success probability score (0-100)"""
-    score = 0
-    breakdown = {}
-    
-    # Budget Score (25 points)
-    budget = project_info.get('budget', '')
-    if '$100k+' in budget:
-        budget_score = 25
-        budget_reason = "Excellent budget allocation"
-    elif '$50k-$100k' in budget:
-        budget_score = 20
-        budget_reason = "Good budget range"
-    elif '$25k-$50k' in budget:
-        budget_score = 15
-        budget_reason = "Moderate budget"
-    else:
-        budget_score = 10
-        budget_reason = "Limited budget may impact scope"
-    
-    breakdown['Budget Feasibility'] = {'score': budget_score, 'max': 25, 'reason': budget_reason}
-    score += budget_score
-    
-    # Timeline Score (25 points)
-    timeline = project_info.get('timeline', '')
-    if '6+' in timeline:
-        timeline_score = 25
-        timeline_reason = "Realistic timeline for quality delivery"
-    elif '5-6' in timeline:
-        timeline_score = 22
-        timeline_reason = "Good timeline planning"
-    elif '3-4' in timeline:
-        timeline_score = 18
-        timeline_reason = "Aggressive but achievable"
-    else:
-        timeline_score = 12
-        timeline_reason = "Very tight timeline, may need scope adjustment"
-    
-    breakdown['Timeline Realism'] = {'score': timeline_score, 'max': 25, 'reason': timeline_reason}
-    score += timeline_score
-    
-    # Priority & Commitment Score (20 points)
-    priority = project_info.get('priority', 'Medium')
-    if priority == 'High':
-        priority_score = 20
-        priority_reason = "High priority shows strong commitment"
-    elif priority == 'Medium':
-        priority_score = 15
-        priority_reason = "Medium priority is reasonable"
-    else:
-        priority_score = 10
-        priority_reason = "Low priority may affect resource allocation"
-    
-    breakdown['Project Priority'] = {'score': priority_score, 'max': 20, 'reason': priority_reason}
-    score += priority_score
-    
-    # Project Type & Market Demand (15 points)
-    proj_type = project_info.get('type', '')
-    high_demand_types = ['AI/ML Solution', 'Web Application', 'Mobile App']
-    if proj_type in high_demand_types:
-        type_score = 15
-        type_reason = f"{proj_type} has strong market demand"
-    else:
-        type_score = 10
-        type_reason = f"{proj_type} has moderate market demand"
-    
-    breakdown['Market Demand'] = {'score': type_score, 'max': 15, 'reason': type_reason}
-    score += type_score
-    
-    # Description Quality (15 points)
-    description = project_info.get('description', '')
-    desc_length = len(description.split())
-    if desc_length > 50:
-        desc_score = 15
-        desc_reason = "Excellent detailed description"
-    elif desc_length > 30:
-        desc_score = 12
-        desc_reason = "Good description with details"
-    elif desc_length > 15:
-        desc_score = 8
-        desc_reason = "Basic description provided"
-    else:
-        desc_score = 5
-        desc_reason = "Description needs more detail"
-    
-    breakdown['Planning Quality'] = {'score': desc_score, 'max': 15, 'reason': desc_reason}
-    score += desc_score
-    
-    # Determine success level
-    if score >= 85:
-        level = "Excellent"
-        color = "green"
-        emoji = "🟢"
-        advice = "High probability of success! Project is well-planned with appropriate resources."
-    elif score >= 70:
-        level = "Good"
-        color = "blue"
-        emoji = "🔵"
-        advice = "Good chance of success. Consider addressing lower-scoring areas for improvement."
-    elif score >= 55:
-        level = "Fair"
-        color = "orange"
-        emoji = "🟡"
-        advice = "Moderate success probability. Recommend reviewing budget, timeline, and scope."
-    else:
-        level = "Needs Improvement"
-        color = "red"
-        emoji = "🔴"
-        advice = "Success risk is high. Strongly recommend revising budget, timeline, or project scope."
+    return (rules or get_scoring_rules()).score(project_info)
+
+# ============ BATCH SUCCESS SCORING ============
+def _factorize_column(projects, field, default, size):
+    """(codes, distinct values) for one input column; a missing column and NaN/None take the default"""
+    if field not in projects:
+        return np.zeros(size, dtype=np.intp), [default]
+    codes, uniques = pd.factorize(pd.Series(projects[field]))
+    uniques = list(uniques)
+    if (codes < 0).any():
+        codes = np.where(codes < 0, len(uniques), codes)
+        uniques.append(default)
+    return codes, uniques
+
+def score_projects_batch(projects, rules=None):
+    """Score many projects at once from columns of budget, timeline, priority, type and
+    description_words (or description), given as a DataFrame or a dict of arrays.
+
+    Returns a DataFrame with one score column per category plus total_score and level, matching
+    calculate_success_score row for row. Field columns are factorized, looked up once per distinct
+    value and broadcast with integer indexing; word counts and levels use the threshold arrays.
+    """
+    rules = rules or get_scoring_rules()
+    size = len(projects) if isinstance(projects, pd.DataFrame) else len(next(iter(projects.values())))
+    columns = {}
+    for category in rules.categories:
+        if category['match'] == 'word_count':
+            if 'description_words' in projects:
+                words = np.asarray(projects['description_words'], dtype=np.int64)
+            elif category['field'] in projects:
+                # Non-text values count as no words, like in the scalar path
+                text = pd.Series(projects[category['field']], dtype=object).fillna(category['missing'])
+                words = text.str.split().str.len().fillna(0).to_numpy(dtype=np.int64)
+            else:
+                words = np.zeros(size, dtype=np.int64)
+            scores = np.array(category['scores'], dtype=np.int16)
+            columns[category['name']] = scores[np.searchsorted(category['bounds'], words, side='left')]
+        else:
+            codes, uniques = _factorize_column(projects, category['field'], category['missing'], size)
+            table = np.array([rules.lookup(category, value)[0] for value in uniques], dtype=np.int16)
+            columns[category['name']] = table[codes]
     
-    return {
-        'total_score': score,
-        'level': level,
-        'color': color,
-        'emoji': emoji,
-        'advice': advice,
-        'breakdown': breakdown
-    }
+    total = np.zeros(size, dtype=np.int16)
+    for scores in columns.values():
+        total += scores
+    columns['total_score'] = total
+    
+    level_idx = np.searchsorted(rules.level_bounds, total, side='right')
+    columns['level'] = pd.Categorical.from_codes(level_idx, [level['level'] for level in rules.levels])
+    
+    index = projects.index if isinstance(projects, pd.DataFrame) else None
+    return pd.DataFrame(columns, index=index)
 
 def create_success_score_chart(score_data):
     """Create radar chart for success score breakdown"""
@@ -277,8 +945,11 @@ def create_success_score_chart(score_data):
     
     return fig
 
-def get_agent_response(client, role, project_info):
-    """Get response from a specific agent role"""
+def build_agent_request(role, project_info, upstream=None):
+    """Build the chat completion request for a specific agent role
+
+    upstream maps the roles this one depends on to their finished analyses.
+    """
     
     prompts = {
         "ceo": f"""You are an experienced CEO. Analyze this project in detail:
@@ -380,6 +1051,16 @@ Provide detailed client success and marketing strategy including:
 """
     }
     
+    prompt = prompts[role]
+    if upstream:
+        context = "\n\n".join(f"### {AGENT_DISPLAY[upstream_role]['label']}\n{text[:UPSTREAM_CONTEXT_CHARS]}"
+                              for upstream_role, text in upstream.items())
+        prompt += f"""
+Build on these analyses from your colleagues and keep your recommendations consistent with them:
+
+{context}
+"""
+    
     temperatures = {
         "ceo": 0.5,
         "cto": 0.3,
@@ -388,19 +1069,611 @@ Provide detailed client success and marketing strategy including:
         "client_manager": 0.4
     }
     
+    return {
+        "model": "gpt-4o-mini",
+        "messages": [
+            {"role": "system", "content": "You are a helpful AI assistant providing expert analysis."},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": temperatures[role],
+        "max_tokens": 2000
+    }
+
+# ============ INCREMENTAL ANALYTICS ============
+class AnalyticsAggregator:
+    """Running project analytics updated in O(1) as projects are added or re-rated"""
+
+    def __init__(self, total=0, score_sum=0, rating_sum=0, type_counts=None):
+        self.total = total
+        self.score_sum = score_sum
+        self.rating_sum = rating_sum
+        self.type_counts = Counter()
+        self.top_type = None
+        self._lock = threading.Lock()
+        for project_type, count in (type_counts or {}).items():
+            self._count_type(project_type, count)
+
+    def _count_type(self, project_type, count=1):
+        # Counts only grow between clears, so the leader can only be overtaken by the type just counted
+        self.type_counts[project_type] += count
+        if self.top_type is None or self.type_counts[project_type] > self.type_counts[self.top_type]:
+            self.top_type = project_type
+
+    def add_project(self, project_type, score=0, rating=0):
+        with self._lock:
+            self.total += 1
+            self.score_sum += score or 0
+            self.rating_sum += rating or 0
+            self._count_type(project_type or 'Unknown')
+
+    def update_rating(self, old_rating, new_rating):
+        with self._lock:
+            self.rating_sum += (new_rating or 0) - (old_rating or 0)
+
+    def adjust_score_sum(self, delta):
+        """Apply the net change from re-scored projects"""
+        with self._lock:
+            self.score_sum += delta
+
+    def reset(self):
+        with self._lock:
+            self.total = self.score_sum = self.rating_sum = 0
+            self.type_counts = Counter()
+            self.top_type = None
+
+    def snapshot(self):
+        """Current sidebar analytics"""
+        with self._lock:
+            total = self.total
+            return {
+                'total_projects': total,
+                'avg_score': self.score_sum / total if total else 0,
+                'total_ratings': self.rating_sum,
+                'avg_rating': self.rating_sum / total if total else 0,
+                'top_type': self.top_type
+            }
+
+# ============ PERSISTENT PROJECT HISTORY ============
+class ProjectStore:
+    """SQLite-backed project history with indexed queries and incrementally maintained aggregates"""
+
+    PROJECT_FIELDS = ["name", "type", "budget", "timeline", "priority", "description",
+                      "technical_requirements", "special_considerations", "timestamp"]
+
+    def __init__(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS projects (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                type TEXT,
+                budget TEXT,
+                timeline TEXT,
+                priority TEXT,
+                description TEXT,
+                technical_requirements TEXT,
+                special_considerations TEXT,
+                timestamp TEXT NOT NULL,
+                success_score INTEGER,
+                score_version TEXT,
+                rating INTEGER,
+                feedback TEXT,
+                analyses TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_projects_type ON projects (type);
+            CREATE INDEX IF NOT EXISTS idx_projects_timestamp ON projects (timestamp);
+            CREATE INDEX IF NOT EXISTS idx_projects_score ON projects (success_score);
+            CREATE TABLE IF NOT EXISTS project_stats (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                total INTEGER NOT NULL DEFAULT 0,
+                score_sum INTEGER NOT NULL DEFAULT 0,
+                rating_sum INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS type_counts (
+                type TEXT PRIMARY KEY,
+                count INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_type_counts_count ON type_counts (count);
+            INSERT OR IGNORE INTO project_stats (id) VALUES (1);
+        """)
+        # Databases created before scores were versioned
+        columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(projects)")}
+        if 'score_version' not in columns:
+            self._conn.execute("ALTER TABLE projects ADD COLUMN score_version TEXT")
+        # ... and before projects had owners (server mode); unowned projects belong to single-user mode
+        if 'owner' not in columns:
+            self._conn.execute("ALTER TABLE projects ADD COLUMN owner TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_projects_score_version ON projects (score_version)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_projects_owner ON projects (owner, timestamp)")
+        self.analytics = self._load_analytics()
+        self._owner_analytics = OrderedDict()
+
+    def _load_analytics(self):
+        totals = self._conn.execute("SELECT total, score_sum, rating_sum FROM project_stats WHERE id = 1").fetchone()
+        type_counts = dict(self._conn.execute("SELECT type, count FROM type_counts").fetchall())
+        return AnalyticsAggregator(totals['total'], totals['score_sum'], totals['rating_sum'], type_counts)
+
+    def _owner_aggregator(self, owner):
+        """One owner's running aggregates, loaded through the owner index on first use (call with the lock held)"""
+        analytics = self._owner_analytics.get(owner)
+        if analytics is not None:
+            self._owner_analytics.move_to_end(owner)
+            return analytics
+        totals = self._conn.execute(
+            "SELECT COUNT(*) AS total, COALESCE(SUM(success_score), 0) AS score_sum, "
+            "COALESCE(SUM(rating), 0) AS rating_sum FROM projects WHERE owner = ?", (owner,)
+        ).fetchone()
+        type_counts = dict(self._conn.execute(
+            "SELECT COALESCE(type, 'Unknown'), COUNT(*) FROM projects WHERE owner = ? GROUP BY 1", (owner,)
+        ).fetchall())
+        analytics = AnalyticsAggregator(totals['total'], totals['score_sum'], totals['rating_sum'], type_counts)
+        return remember(self._owner_analytics, owner, analytics, OWNER_ANALYTICS_LIMIT)
+
+    def add_project(self, project_info, success_score=None, score_version=None, owner=None):
+        """Insert a project and update the running aggregates, returning its id"""
+        values = [project_info.get(field) for field in self.PROJECT_FIELDS]
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                f"INSERT INTO projects ({', '.join(self.PROJECT_FIELDS)}, success_score, score_version, owner) "
+                f"VALUES ({', '.join('?' * len(self.PROJECT_FIELDS))}, ?, ?, ?)",
+                values + [success_score, score_version, owner]
+            )
+            self._conn.execute("UPDATE project_stats SET total = total + 1, score_sum = score_sum + ? WHERE id = 1",
+                               (success_score or 0,))
+            self._conn.execute("INSERT INTO type_counts (type, count) VALUES (?, 1) "
+                               "ON CONFLICT(type) DO UPDATE SET count = count + 1",
+                               (project_info.get('type') or 'Unknown',))
+            # Owners not loaded yet pick the new row up when they are
+            if owner in self._owner_analytics:
+                self._owner_analytics[owner].add_project(project_info.get('type'), success_score)
+        self.analytics.add_project(project_info.get('type'), success_score)
+        return cursor.lastrowid
+
+    def update_rating(self, project_id, rating):
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT rating, owner FROM projects WHERE id = ?", (project_id,)).fetchone()
+            if row is None:
+                return
+            self._conn.execute("UPDATE projects SET rating = ? WHERE id = ?", (rating, project_id))
+            self._conn.execute("UPDATE project_stats SET rating_sum = rating_sum + ? WHERE id = 1",
+                               ((rating or 0) - (row['rating'] or 0),))
+            self.analytics.update_rating(row['rating'], rating)
+            if row['owner'] in self._owner_analytics:
+                self._owner_analytics[row['owner']].update_rating(row['rating'], rating)
+
+    def update_feedback(self, project_id, feedback):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE projects SET feedback = ? WHERE id = ?", (feedback, project_id))
+
+    def save_analyses(self, project_id, analyses):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE projects SET analyses = ? WHERE id = ?", (json.dumps(analyses), project_id))
+
+    def _to_dict(self, row):
+        project = dict(row)
+        project['analyses'] = json.loads(project['analyses']) if project['analyses'] else {}
+        return project
+
+    def get(self, project_id, owner=None):
+        """A project by id; with an owner, only if it belongs to them"""
+        with self._lock:
+            if owner is None:
+                row = self._conn.execute("SELECT * FROM projects WHERE id = ?", (project_id,)).fetchone()
+            else:
+                row = self._conn.execute("SELECT * FROM projects WHERE id = ? AND owner = ?",
+                                         (project_id, owner)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def recent(self, limit=5, owner=None):
+        """Most recent projects first, across all owners or one owner's"""
+        with self._lock:
+            if owner is None:
+                rows = self._conn.execute("SELECT * FROM projects ORDER BY timestamp DESC, id DESC LIMIT ?",
+                                          (limit,)).fetchall()
+            else:
+                rows = self._conn.execute("SELECT * FROM projects WHERE owner = ? "
+                                          "ORDER BY timestamp DESC, id DESC LIMIT ?", (owner, limit)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def rescore(self, rules, chunk_size=RESCORE_CHUNK_SIZE):
+        """Re-score projects scored under another rules version, a chunk at a time; returns how many were re-scored"""
+        rescored = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, budget, timeline, priority, type, description, success_score FROM projects "
+                    "WHERE score_version IS NULL OR score_version != ? LIMIT ?",
+                    (rules.version, chunk_size)
+                ).fetchall()
+            if not rows:
+                return rescored
+            chunk = pd.DataFrame([dict(row) for row in rows])
+            scores = score_projects_batch(chunk, rules)['total_score'].to_numpy()
+            delta = int(scores.sum()) - int(chunk['success_score'].fillna(0).sum())
+            with self._lock, self._conn:
+                # One transaction per chunk rather than one per row in autocommit mode
+                self._conn.execute("BEGIN")
+                self._conn.executemany("UPDATE projects SET success_score = ?, score_version = ? WHERE id = ?",
+                                       [(int(score), rules.version, int(project_id))
+                                        for score, project_id in zip(scores, chunk['id'])])
+                self._conn.execute("UPDATE project_stats SET score_sum = score_sum + ? WHERE id = 1", (delta,))
+                # The chunk's owners are not tracked, so loaded owner aggregates are rebuilt on next use
+                self._owner_analytics.clear()
+            self.analytics.adjust_score_sum(delta)
+            rescored += len(rows)
+
+    def stats(self, owner=None):
+        """Sidebar analytics snapshot from the running aggregates, for everyone or for one owner"""
+        if owner is None:
+            return self.analytics.snapshot()
+        with self._lock:
+            analytics = self._owner_aggregator(owner)
+        return analytics.snapshot()
+
+    def clear(self, owner=None):
+        """Delete every project, or only one owner's while keeping the shared aggregates consistent"""
+        with self._lock, self._conn:
+            if owner is None:
+                self._conn.execute("DELETE FROM projects")
+                self._conn.execute("DELETE FROM type_counts")
+                self._conn.execute("UPDATE project_stats SET total = 0, score_sum = 0, rating_sum = 0 WHERE id = 1")
+                self.analytics.reset()
+                self._owner_analytics.clear()
+                return
+            self._conn.execute("BEGIN")
+            self._conn.execute(
+                "UPDATE project_stats SET total = project_stats.total - t.total, "
+                "score_sum = project_stats.score_sum - t.score_sum, "
+                "rating_sum = project_stats.rating_sum - t.rating_sum FROM (SELECT COUNT(*) AS total, "
+                "COALESCE(SUM(success_score), 0) AS score_sum, COALESCE(SUM(rating), 0) AS rating_sum "
+                "FROM projects WHERE owner = ?) AS t WHERE id = 1", (owner,)
+            )
+            self._conn.execute(
+                "UPDATE type_counts SET count = type_counts.count - t.count FROM (SELECT COALESCE(type, 'Unknown') AS type, "
+                "COUNT(*) AS count FROM projects WHERE owner = ? GROUP BY 1) AS t WHERE type_counts.type = t.type",
+                (owner,)
+            )
+            self._conn.execute("DELETE FROM type_counts WHERE count <= 0")
+            self._conn.execute("DELETE FROM projects WHERE owner = ?", (owner,))
+            self.analytics = self._load_analytics()
+            self._owner_analytics.pop(owner, None)
+
+def get_active_analysis(project_store):
+    """The analysis on screen, rehydrated from history by id (None until one has completed)"""
+    project_id = st.session_state.last_project_id
+    project = project_store.get(project_id, owner=current_user_id()) if project_id else None
+    return project if project and project['analyses'] else None
+
+@st.cache_resource
+def get_project_store():
+    """Shared project history store for this process, with history brought up to the current scoring rules"""
+    store = ProjectStore(PROJECT_STORE_PATH)
+    store.rescore(get_scoring_rules())
+    return store
+
+# ============ RESPONSE CACHE ============
+class ResponseCache:
+    """Persistent SQLite cache of agent responses with TTL, LRU eviction and a byte-size cap"""
+
+    def __init__(self, path, ttl=RESPONSE_CACHE_TTL, max_bytes=RESPONSE_CACHE_MAX_BYTES):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            role TEXT,
+            value TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)")
+
+    @staticmethod
+    def make_key(role, request):
+        """Hash of the role, rendered prompt, model, temperature and max_tokens"""
+        material = json.dumps({
+            "role": role,
+            "messages": request["messages"],
+            "model": request["model"],
+            "temperature": request["temperature"],
+            "max_tokens": request["max_tokens"]
+        }, sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Return the cached response for `key`, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def set(self, key, role, value):
+        """Store a response and evict expired or least recently used entries"""
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, role, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, role, value, size, now, now)
+            )
+            self._evict(now)
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        stale = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+@st.cache_resource
+def get_response_cache():
+    """Shared response cache for this process"""
+    return ResponseCache(RESPONSE_CACHE_PATH)
+
+def get_agent_response(client, role, project_info, cache_mode="use", on_usage=None, priority=PRIORITY_ANALYSIS,
+                       upstream=None):
+    """Get response from a specific agent role
+
+    cache_mode is "use" (serve from cache when possible), "refresh" (always call the model
+    and overwrite the cached entry) or "bypass" (neither read nor write the cache).
+    on_usage, if given, is called with (role, response.usage) after each model call.
+    upstream holds the analyses of the roles this one builds on (see ROLE_DEPENDENCIES).
+    """
+    request = build_agent_request(role, project_info, upstream)
+    cache = get_response_cache() if cache_mode != "bypass" else None
+    cache_key = ResponseCache.make_key(role, request) if cache else None
+    if cache and cache_mode == "use":
+        cached = cache.get(cache_key)
+        if cached is not None:
+            get_llm_telemetry().record_cache_hit(role, request)
+            return cached
+    
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a helpful AI assistant providing expert analysis."},
-                {"role": "user", "content": prompts[role]}
-            ],
-            temperature=temperatures[role],
-            max_tokens=2000
-        )
-        return response.choices[0].message.content
+        response = get_request_scheduler().create(client, request, role, priority)
+        content = response.choices[0].message.content
     except Exception as e:
-        return f"Error getting response: {str(e)}"
+        return f"{AGENT_ERROR_PREFIX}: {str(e)}"
+    
+    if on_usage and response.usage:
+        on_usage(role, response.usage)
+    
+    if cache and content:
+        cache.set(cache_key, role, content)
+    return content
+
+def stream_agent_response(client, role, project_info, cache_mode="use", priority=PRIORITY_ANALYSIS, upstream=None):
+    """Stream response from a specific agent role, yielding text chunks as they arrive"""
+    request = build_agent_request(role, project_info, upstream)
+    cache = get_response_cache() if cache_mode != "bypass" else None
+    cache_key = ResponseCache.make_key(role, request) if cache else None
+    if cache and cache_mode == "use":
+        cached = cache.get(cache_key)
+        if cached is not None:
+            get_llm_telemetry().record_cache_hit(role, request)
+            yield cached
+            return
+    
+    parts = []
+    try:
+        stream = get_request_scheduler().create(client, request, role, priority, stream=True)
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+                yield chunk.choices[0].delta.content
+    except Exception as e:
+        yield f"{AGENT_ERROR_PREFIX}: {str(e)}"
+        return
+    
+    if cache and parts:
+        cache.set(cache_key, role, "".join(parts))
+
+# ============ CONCURRENT ANALYSIS ENGINE ============
+def _agent_executor(max_workers):
+    """Create a thread pool whose workers share the current Streamlit script context"""
+    ctx = get_script_run_ctx(suppress_warning=True)
+
+    def attach_context():
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+
+    return ThreadPoolExecutor(max_workers=max_workers, initializer=attach_context)
+
+class AgentPipeline:
+    """Dependency-aware scheduling of agent roles on a thread pool.
+
+    A role is submitted as soon as every role it depends on has finished (or was
+    supplied in `reuse`), so independent roles run concurrently and dependent ones
+    start the moment their upstream completes. Dependencies that are neither run
+    nor reused are skipped rather than waited for. run_role(role, upstream) gets the
+    successful upstream analyses keyed by role.
+    """
+
+    def __init__(self, pool, roles, run_role, reuse=None, dependencies=ROLE_DEPENDENCIES):
+        self.pool = pool
+        self.run_role = run_role
+        self.dependencies = dependencies
+        self.results = dict(reuse or {})
+        self.pending = [role for role in roles if role not in self.results]
+        # Every role this run produces, whether waiting, running or finished
+        self.scheduled = set(self.pending)
+        self._lock = threading.Lock()
+
+    def _upstream_roles(self, role):
+        return [dep for dep in self.dependencies.get(role, []) if dep in self.scheduled or dep in self.results]
+
+    def _submit_ready(self):
+        """Submit every pending role whose upstream is complete; returns {future: role}"""
+        submitted = {}
+        with self._lock:
+            for role in list(self.pending):
+                deps = self._upstream_roles(role)
+                if all(dep in self.results for dep in deps):
+                    self.pending.remove(role)
+                    upstream = {dep: self.results[dep] for dep in deps
+                                if self.results[dep] and not self.results[dep].startswith(AGENT_ERROR_PREFIX)}
+                    submitted[self.pool.submit(self.run_role, role, upstream)] = role
+        return submitted
+
+    def start(self):
+        return self._submit_ready()
+
+    def complete(self, role, result):
+        """Record a finished role and submit the roles it unblocked"""
+        with self._lock:
+            self.results[role] = result
+        return self._submit_ready()
+
+def with_downstream(roles):
+    """`roles` plus every role that depends on them, directly or transitively, in tab order"""
+    affected = set(roles)
+    grown = True
+    while grown:
+        downstream = {role for role in AGENT_ROLES if set(ROLE_DEPENDENCIES.get(role, [])) & affected}
+        grown = not downstream <= affected
+        affected |= downstream
+    return [role for role in AGENT_ROLES if role in affected]
+
+def affected_roles(changed_fields):
+    """Roles whose prompt uses one of `changed_fields`, plus every role downstream of them, in tab order"""
+    return with_downstream(role for role in AGENT_ROLES if set(ROLE_INPUTS[role]) & set(changed_fields))
+
+def plan_incremental_analysis(previous_info, previous_analyses, project_info):
+    """Work out which roles an edited project needs re-requested, reusing the rest of a previous analysis.
+
+    Returns (changes, rerun, reuse): the prompt fields that differ as {field: (old, new)}, the roles
+    whose prompt or upstream changed or whose previous answer failed, and the previous analyses
+    of every other role keyed by role.
+    """
+    changes = {field: (previous_info.get(field), project_info.get(field)) for field in PROMPT_FIELDS
+               if previous_info.get(field) != project_info.get(field)}
+    failed = [role for role in AGENT_ROLES
+              if not previous_analyses.get(AGENT_DISPLAY[role]['label'])
+              or previous_analyses[AGENT_DISPLAY[role]['label']].startswith(AGENT_ERROR_PREFIX)]
+    rerun = with_downstream(set(affected_roles(changes)) | set(failed))
+    reuse = {role: previous_analyses[AGENT_DISPLAY[role]['label']] for role in AGENT_ROLES if role not in rerun}
+    return changes, rerun, reuse
+
+def show_analysis_changes(change_log, expanded=False):
+    """'What changed' view: edited fields and which agents were re-analyzed or reused"""
+    rerun, reused = change_log['rerun'], change_log['reused']
+    with st.expander(f"🔀 What Changed — {len(rerun)} of {len(AGENT_ROLES)} agents re-analyzed", expanded=expanded):
+        st.markdown(f"Compared with **{change_log['previous']}**")
+        if change_log['changes']:
+            shorten = lambda value: value if len(str(value)) <= 120 else f"{str(value)[:117]}..."
+            st.table({
+                "Field": [field.title() for field in change_log['changes']],
+                "Before": [shorten(old) for old, _ in change_log['changes'].values()],
+                "After": [shorten(new) for _, new in change_log['changes'].values()]
+            })
+        else:
+            st.info("No agent inputs changed")
+        if rerun:
+            st.markdown("**🔄 Re-analyzed:** " + ", ".join(AGENT_DISPLAY[role]['label'] for role in rerun))
+        if reused:
+            st.markdown("**♻️ Reused unchanged:** " + ", ".join(AGENT_DISPLAY[role]['label'] for role in reused))
+
+def run_agent_analyses(client, project_info, roles=None, max_workers=None, cache_mode="use", on_usage=None,
+                       priority=PRIORITY_ANALYSIS, reuse=None):
+    """Request agent analyses through the dependency pipeline, yielding (role, response) as each one finishes
+
+    reuse maps roles to analyses kept from an earlier run; they are not requested again
+    but still feed the roles that depend on them.
+    """
+    roles = [role for role in (roles or AGENT_ROLES) if role not in (reuse or {})]
+    max_workers = max(1, min(max_workers or MAX_CONCURRENT_AGENTS, len(roles) or 1))
+
+    def run_role(role, upstream):
+        return get_agent_response(client, role, project_info, cache_mode, on_usage, priority, upstream)
+
+    with _agent_executor(max_workers) as pool:
+        pipeline = AgentPipeline(pool, roles, run_role, reuse)
+        futures = pipeline.start()
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                role = futures.pop(future)
+                response = future.result()
+                futures.update(pipeline.complete(role, response))
+                yield role, response
+
+def stream_agent_analyses(client, project_info, roles=None, max_workers=None, timings=None, cache_mode="use",
+                          priority=PRIORITY_ANALYSIS, reuse=None):
+    """Stream agent analyses through the dependency pipeline, yielding (role, text, done) events as chunks arrive.
+
+    While a role is streaming `text` is the newest chunk; its final event carries the full
+    response with done=True. Time-to-first-token and total time per role go into `timings`,
+    measured from when the role starts (after its upstream roles finish). Roles in `reuse`
+    are not requested again.
+    """
+    roles = [role for role in (roles or AGENT_ROLES) if role not in (reuse or {})]
+    max_workers = max(1, min(max_workers or MAX_CONCURRENT_AGENTS, len(roles) or 1))
+    events = queue.Queue()
+
+    def stream_role(role, upstream):
+        start = time.perf_counter()
+        first_token = None
+        parts = []
+        try:
+            for chunk in stream_agent_response(client, role, project_info, cache_mode, priority, upstream):
+                if first_token is None:
+                    first_token = time.perf_counter() - start
+                parts.append(chunk)
+                events.put((role, chunk, False))
+        finally:
+            if timings is not None:
+                timings[role] = {
+                    "ttft": first_token,
+                    "total": time.perf_counter() - start,
+                    "chars": sum(len(part) for part in parts)
+                }
+            events.put((role, "".join(parts), True))
+
+    with _agent_executor(max_workers) as pool:
+        pipeline = AgentPipeline(pool, roles, stream_role, reuse)
+        pipeline.start()
+        remaining = len(roles)
+        while remaining:
+            role, text, done = events.get()
+            if done:
+                remaining -= 1
+                pipeline.complete(role, text)
+            yield role, text, done
 
 def create_budget_chart(budget_range):
     """Create budget breakdown pie chart"""
@@ -498,37 +1771,466 @@ def create_risk_matrix():
     )
     return fig
 
+# ============ DASHBOARD FIGURE CACHE ============
+FIGURE_BUILDERS = {
+    "success_score": create_success_score_chart,
+    "budget": create_budget_chart,
+    "timeline": create_timeline_chart,
+    "risk": create_risk_matrix
+}
+
+def figure_key(kind, args):
+    """Cache key for a chart: the input values the figure actually depends on"""
+    if kind == "success_score":
+        breakdown = args[0]['breakdown']
+        return [[category, data['score'], data['max']] for category, data in breakdown.items()]
+    return list(args)
+
+class FigureCache:
+    """Dashboard figures keyed by their inputs, kept in memory and optionally as Plotly JSON on disk.
+
+    Cached figures are shared between sessions and must be treated as read-only.
+    """
+
+    def __init__(self, cache_dir=FIGURE_CACHE_DIR, score_cache_size=SCORE_FIGURE_CACHE_SIZE):
+        self.cache_dir = cache_dir
+        self.score_cache_size = score_cache_size
+        self.hits = 0
+        self.misses = 0
+        self._figures = {}
+        # Success-score radars have many more input combinations, so they get a bounded LRU
+        self._score_figures = OrderedDict()
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        material = json.dumps([FIGURE_CACHE_VERSION, importlib.metadata.version("plotly"), key])
+        return os.path.join(self.cache_dir, hashlib.sha256(material.encode("utf-8")).hexdigest()[:24] + ".json")
+
+    def get(self, kind, *args):
+        """Return the figure for `kind` built from `args`, constructing it only on first use"""
+        key = json.dumps([kind, figure_key(kind, args)])
+        store = self._score_figures if kind == "success_score" else self._figures
+        with self._lock:
+            fig = store.get(key)
+            if fig is not None:
+                self.hits += 1
+                if store is self._score_figures:
+                    store.move_to_end(key)
+                return fig
+            self.misses += 1
+        
+        fig = self._load(key)
+        if fig is None:
+            fig = FIGURE_BUILDERS[kind](*args)
+            self._save(key, fig)
+        
+        with self._lock:
+            store[key] = fig
+            if store is self._score_figures and len(store) > self.score_cache_size:
+                store.popitem(last=False)
+        return fig
+
+    def _load(self, key):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._disk_path(key), encoding="utf-8") as f:
+                return pio.from_json(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def _save(self, key, fig):
+        if not self.cache_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(fig.to_json())
+        os.replace(tmp_path, path)
+
+    def warm(self):
+        """Build every budget, timeline and risk figure up front"""
+        for budget_range in BUDGET_OPTIONS:
+            self.get("budget", budget_range)
+        for timeline in TIMELINE_OPTIONS:
+            self.get("timeline", timeline)
+        self.get("risk")
+        return self
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "figures": len(self._figures) + len(self._score_figures)}
+
+@st.cache_resource
+def get_figure_cache():
+    """Shared dashboard figure cache, warmed when the app starts"""
+    return FigureCache().warm()
+
+# ============ STREAMING PDF WRITER ============
+PDF_PAGE_WIDTH = 210.0
+PDF_PAGE_HEIGHT = 297.0
+PDF_MARGIN = 10.0
+PDF_BOTTOM_MARGIN = 15.0
+PT_PER_MM = 72 / 25.4
+
+# Stand-ins for common characters the built-in PDF fonts cannot show
+PDF_TEXT_REPLACEMENTS = {
+    "→": "->", "←": "<-", "↔": "<->", "⇒": "=>",
+    "≤": "<=", "≥": ">=", "≠": "!=", "−": "-",
+    "✓": "v", "✔": "v", "✗": "x", "✘": "x",
+    " ": " ", " ": " ", "​": ""
+}
+
+def _pdf_fallback(char, can_show):
+    """Closest showable text for one character: a replacement, the unaccented letter, nothing for symbols, else '?'"""
+    if char in PDF_TEXT_REPLACEMENTS:
+        return PDF_TEXT_REPLACEMENTS[char]
+    base = "".join(c for c in unicodedata.normalize("NFKD", char) if not unicodedata.combining(c))
+    if base and all(can_show(c) for c in base):
+        return base
+    if unicodedata.category(char) in ("So", "Sk", "Mn", "Cf", "Cs", "Co"):
+        # Emoji, pictographs and joiners have no sensible text equivalent
+        return ""
+    return "?"
+
+def normalize_pdf_text(text, can_show):
+    """Map the characters a font cannot show to their closest showable text"""
+    missing = {char for char in set(text) if char != "\n" and not can_show(char)}
+    if not missing:
+        return text
+    return text.translate({ord(char): _pdf_fallback(char, can_show) for char in missing})
+
+class _CoreFont:
+    """Built-in Helvetica with WinAnsi (cp1252) encoding"""
+
+    def __init__(self, bold=False):
+        from fpdf.fonts import fpdf_charwidths
+        self.base_font = "Helvetica-Bold" if bold else "Helvetica"
+        widths = fpdf_charwidths["helveticaB" if bold else "helvetica"]
+        self.widths = [widths[chr(code)] for code in range(256)]
+
+    @staticmethod
+    def can_show(char):
+        try:
+            char.encode("cp1252")
+            return True
+        except UnicodeEncodeError:
+            return False
+
+    def prepare(self, text):
+        return normalize_pdf_text(text, self.can_show)
+
+    def width(self, text, size):
+        return sum(map(self.widths.__getitem__, text.encode("cp1252"))) * size / 1000
+
+    def encode(self, text):
+        raw = text.encode("cp1252").replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+        return b"(" + raw + b")"
+
+    def write_objects(self, writer, obj_num):
+        writer.write_obj(obj_num, f"<< /Type /Font /Subtype /Type1 /BaseFont /{self.base_font} "
+                                  f"/Encoding /WinAnsiEncoding >>".encode("ascii"))
+
+PDF_IDENTITY_TO_UNICODE = (
+    b"/CIDInit /ProcSet findresource begin\n12 dict begin\nbegincmap\n"
+    b"/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def\n"
+    b"/CMapName /Adobe-Identity-UCS def\n/CMapType 2 def\n"
+    b"1 begincodespacerange\n<0000> <FFFF>\nendcodespacerange\n"
+    b"1 beginbfrange\n<0000> <FFFF> <0000>\nendbfrange\n"
+    b"endcmap\nCMapName currentdict /CMap defineresource pop\nend\nend"
+)
+
+class _TrueTypeFont:
+    """Embedded TrueType font addressed by Unicode code point, subset to the characters used"""
+
+    def __init__(self, path):
+        from fpdf.ttfonts import TTFontFile
+        ttf = TTFontFile()
+        ttf.getMetrics(path)
+        self.path = path
+        self.name = "".join(c for c in ttf.fullName if c.isalnum() or c in "-_") or "Embedded"
+        self.char_widths = ttf.charWidths
+        self.missing_width = int(round(ttf.defaultWidth))
+        self.descriptor = {
+            "Ascent": int(round(ttf.ascent)), "Descent": int(round(ttf.descent)),
+            "CapHeight": int(round(ttf.capHeight)), "Flags": (ttf.flags | 4) & ~32,
+            "FontBBox": "[%d %d %d %d]" % tuple(int(round(v)) for v in ttf.bbox),
+            "ItalicAngle": int(ttf.italicAngle), "StemV": int(round(ttf.stemV)),
+            "MissingWidth": self.missing_width
+        }
+        self.used = set()
+
+    def can_show(self, char):
+        code = ord(char)
+        return code < 0x10000 and code < len(self.char_widths) and self.char_widths[code] > 0
+
+    def prepare(self, text):
+        return normalize_pdf_text(text, self.can_show)
+
+    def _char_width(self, code):
+        width = self.char_widths[code] if code < len(self.char_widths) else 0
+        return self.missing_width if width in (0, 65535) else width
+
+    def width(self, text, size):
+        return sum(self._char_width(ord(c)) for c in text) * size / 1000
+
+    def encode(self, text):
+        self.used.update(ord(c) for c in text)
+        return b"<" + text.encode("utf-16-be").hex().upper().encode("ascii") + b">"
+
+    def write_objects(self, writer, obj_num):
+        from fpdf.ttfonts import TTFontFile
+        ttf = TTFontFile()
+        font_data = ttf.makeSubset(self.path, sorted(self.used | {32}))
+        cid_to_gid = bytearray(0x10000 * 2)
+        for code, glyph in ttf.codeToGlyph.items():
+            cid_to_gid[code * 2:code * 2 + 2] = glyph.to_bytes(2, "big")
+        widths = " ".join(f"{code} [{self._char_width(code)}]" for code in sorted(self.used))
+        base_font = f"AGENCY+{self.name}"
+
+        cid_font, descriptor, to_unicode, gid_map, font_file = (writer.new_obj_num() for _ in range(5))
+        writer.write_obj(obj_num, (f"<< /Type /Font /Subtype /Type0 /BaseFont /{base_font} /Encoding /Identity-H "
+                                   f"/DescendantFonts [{cid_font} 0 R] /ToUnicode {to_unicode} 0 R >>").encode("ascii"))
+        writer.write_obj(cid_font, (f"<< /Type /Font /Subtype /CIDFontType2 /BaseFont /{base_font} "
+                                    f"/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> "
+                                    f"/FontDescriptor {descriptor} 0 R /DW {self.missing_width} /W [{widths}] "
+                                    f"/CIDToGIDMap {gid_map} 0 R >>").encode("ascii"))
+        writer.write_obj(descriptor, ("<< /Type /FontDescriptor /FontName /" + base_font + " " +
+                                      " ".join(f"/{k} {v}" for k, v in self.descriptor.items()) +
+                                      f" /FontFile2 {font_file} 0 R >>").encode("ascii"))
+        writer.write_stream(to_unicode, PDF_IDENTITY_TO_UNICODE)
+        writer.write_stream(gid_map, bytes(cid_to_gid))
+        writer.write_stream(font_file, font_data, extra=f"/Length1 {len(font_data)}")
+
+def jpeg_info(data):
+    """(width, height, color space) read from a JPEG's frame header"""
+    pos = 2
+    while pos + 9 < len(data):
+        if data[pos] != 0xFF:
+            pos += 1
+            continue
+        marker = data[pos + 1]
+        length = int.from_bytes(data[pos + 2:pos + 4], "big")
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height = int.from_bytes(data[pos + 5:pos + 7], "big")
+            width = int.from_bytes(data[pos + 7:pos + 9], "big")
+            components = data[pos + 9]
+            return width, height, {1: "DeviceGray", 4: "DeviceCMYK"}.get(components, "DeviceRGB")
+        pos += 2 + length
+    raise ValueError("Not a JPEG image")
+
+class StreamingPDFWriter:
+    """A4 PDF writer that lays out text and JPEG images and writes each finished page straight to the sink.
+
+    Only the current page and the object offsets are held in memory, so report size does not
+    change the memory footprint. Text uses an embedded TrueType font (AGENCY_PDF_FONT) for full
+    Unicode, or the built-in Helvetica with cp1252 and closest-character fallbacks.
+    """
+
+    def __init__(self, sink, title=None, font_path=PDF_FONT_PATH, bold_font_path=PDF_BOLD_FONT_PATH):
+        self._owns_sink = isinstance(sink, (str, os.PathLike))
+        self._sink = open(sink, "wb") if self._owns_sink else sink
+        self._offset = 0
+        self._offsets = {}
+        self._next_obj = 1
+        self._catalog, self._pages_obj, self._resources_obj = (self.new_obj_num() for _ in range(3))
+        self._page_objs = []
+        self._images = []
+        self._page_ops = None
+        self.title = title
+        self.y = PDF_MARGIN
+
+        if font_path:
+            regular = _TrueTypeFont(font_path)
+            bold = _TrueTypeFont(bold_font_path) if bold_font_path else regular
+        else:
+            regular, bold = _CoreFont(), _CoreFont(bold=True)
+        self._fonts = {"F1": regular}
+        if bold is not regular:
+            self._fonts["F2"] = bold
+        self._font_objs = {name: self.new_obj_num() for name in self._fonts}
+        self._font_names = {False: "F1", True: "F2" if bold is not regular else "F1"}
+
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        elif self._owns_sink:
+            self._sink.close()
+
+    # ---- low-level object output ----
+    def _write(self, data):
+        self._sink.write(data)
+        self._offset += len(data)
+
+    def new_obj_num(self):
+        num = self._next_obj
+        self._next_obj += 1
+        return num
+
+    def write_obj(self, num, body):
+        self._offsets[num] = self._offset
+        self._write(f"{num} 0 obj\n".encode("ascii") + body + b"\nendobj\n")
+
+    def write_stream(self, num, data, extra="", compress=True):
+        if compress:
+            data = zlib.compress(data)
+            extra = f"/Filter /FlateDecode {extra}"
+        header = f"<< /Length {len(data)} {extra} >>\nstream\n".encode("ascii")
+        self.write_obj(num, header + data + b"\nendstream")
+
+    # ---- pages ----
+    def add_page(self):
+        self._flush_page()
+        self._page_ops = []
+        self.y = PDF_MARGIN
+
+    def _flush_page(self):
+        if self._page_ops is None:
+            return
+        page_num, content_num = self.new_obj_num(), self.new_obj_num()
+        self.write_stream(content_num, b"\n".join(self._page_ops))
+        self.write_obj(page_num, (f"<< /Type /Page /Parent {self._pages_obj} 0 R "
+                                  f"/MediaBox [0 0 {PDF_PAGE_WIDTH * PT_PER_MM:.2f} {PDF_PAGE_HEIGHT * PT_PER_MM:.2f}] "
+                                  f"/Resources {self._resources_obj} 0 R /Contents {content_num} 0 R >>").encode("ascii"))
+        self._page_objs.append(page_num)
+        self._page_ops = None
+
+    def _ensure_space(self, height):
+        if self._page_ops is None or self.y + height > PDF_PAGE_HEIGHT - PDF_BOTTOM_MARGIN:
+            self.add_page()
+
+    @property
+    def page_count(self):
+        return len(self._page_objs) + (1 if self._page_ops is not None else 0)
+
+    # ---- layout ----
+    def ln(self, height):
+        self.y += height
+
+    def _wrap(self, font, text, size, max_width):
+        space = font.width(" ", size)
+        for paragraph in text.split("\n"):
+            words, line_width = [], 0.0
+            for word in paragraph.split(" "):
+                word_width = font.width(word, size)
+                if words and line_width + space + word_width <= max_width:
+                    words.append(word)
+                    line_width += space + word_width
+                    continue
+                if words:
+                    yield " ".join(words)
+                # Break words wider than the whole line
+                while word_width > max_width:
+                    cut = len(word) - 1
+                    while cut > 1 and font.width(word[:cut], size) > max_width:
+                        cut -= 1
+                    yield word[:cut]
+                    word = word[cut:]
+                    word_width = font.width(word, size)
+                words, line_width = [word], word_width
+            yield " ".join(words)
+
+    def text(self, text, size=10, bold=False, line_height=5, align="L"):
+        """Lay out wrapped text across as many pages as it needs"""
+        name = self._font_names[bold]
+        font = self._fonts[name]
+        max_width = (PDF_PAGE_WIDTH - 2 * PDF_MARGIN) * PT_PER_MM
+        for line in self._wrap(font, font.prepare(text), size, max_width):
+            self._ensure_space(line_height)
+            x = PDF_MARGIN * PT_PER_MM
+            if align == "C":
+                x += (max_width - font.width(line, size)) / 2
+            # Baseline placed like FPDF cells: vertically centred in the line box
+            baseline = (PDF_PAGE_HEIGHT - self.y - line_height / 2) * PT_PER_MM - 0.3 * size
+            if line:
+                self._page_ops.append(f"BT /{name} {size} Tf {x:.2f} {baseline:.2f} Td ".encode("ascii") +
+                                      font.encode(line) + b" Tj ET")
+            self.y += line_height
+
+    def image_jpeg(self, data, width=PDF_PAGE_WIDTH - 2 * PDF_MARGIN):
+        """Embed a JPEG at the current position, scaled to `width` mm"""
+        px_width, px_height, color_space = jpeg_info(data)
+        height = width * px_height / px_width
+        self._ensure_space(height)
+        num = self.new_obj_num()
+        name = f"I{len(self._images) + 1}"
+        self.write_stream(num, data, compress=False,
+                          extra=f"/Type /XObject /Subtype /Image /Width {px_width} /Height {px_height} "
+                                f"/ColorSpace /{color_space} /BitsPerComponent 8 /Filter /DCTDecode")
+        self._images.append((name, num))
+        self._page_ops.append(f"q {width * PT_PER_MM:.2f} 0 0 {height * PT_PER_MM:.2f} {PDF_MARGIN * PT_PER_MM:.2f} "
+                              f"{(PDF_PAGE_HEIGHT - self.y - height) * PT_PER_MM:.2f} cm /{name} Do Q".encode("ascii"))
+        self.y += height
+
+    # ---- document trailer ----
+    def close(self):
+        """Write fonts, page tree, catalog and cross-reference table"""
+        if self._page_ops is None and not self._page_objs:
+            self.add_page()
+        self._flush_page()
+        for name, font in self._fonts.items():
+            font.write_objects(self, self._font_objs[name])
+        fonts = " ".join(f"/{name} {num} 0 R" for name, num in self._font_objs.items())
+        images = " ".join(f"/{name} {num} 0 R" for name, num in self._images)
+        self.write_obj(self._resources_obj, (f"<< /ProcSet [/PDF /Text /ImageC] /Font << {fonts} >> "
+                                             f"/XObject << {images} >> >>").encode("ascii"))
+        kids = " ".join(f"{num} 0 R" for num in self._page_objs)
+        self.write_obj(self._pages_obj, f"<< /Type /Pages /Kids [{kids}] /Count {len(self._page_objs)} >>".encode("ascii"))
+        self.write_obj(self._catalog, f"<< /Type /Catalog /Pages {self._pages_obj} 0 R >>".encode("ascii"))
+        info = self.new_obj_num()
+        title = ("FEFF" + (self.title or "").encode("utf-16-be").hex().upper())
+        self.write_obj(info, f"<< /Producer (TechSeva AI Services Agency) /Title <{title}> >>".encode("ascii"))
+
+        xref_offset = self._offset
+        entries = [b"0000000000 65535 f \n"] + [f"{self._offsets[num]:010d} 00000 n \n".encode("ascii")
+                                                for num in range(1, self._next_obj)]
+        self._write(f"xref\n0 {self._next_obj}\n".encode("ascii") + b"".join(entries))
+        self._write(f"trailer\n<< /Size {self._next_obj} /Root {self._catalog} 0 R /Info {info} 0 R >>\n"
+                    f"startxref\n{xref_offset}\n%%EOF\n".encode("ascii"))
+        if self._owns_sink:
+            self._sink.close()
+        else:
+            self._sink.flush()
+
 def export_to_pdf(project_info, analyses):
     """Export analysis to PDF"""
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", 'B', 16)
-    
-    # Title
-    pdf.cell(0, 10, f"Project Analysis: {project_info['name']}", ln=True, align='C')
-    pdf.ln(10)
-    
-    # Project Details
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(0, 10, "Project Details", ln=True)
-    pdf.set_font("Arial", '', 10)
-    pdf.multi_cell(0, 5, f"Type: {project_info['type']}\nBudget: {project_info['budget']}\nTimeline: {project_info['timeline']}\nPriority: {project_info['priority']}")
-    pdf.ln(5)
-    
-    # Add each analysis
-    for agent, content in analyses.items():
-        pdf.set_font("Arial", 'B', 12)
-        pdf.cell(0, 10, agent, ln=True)
-        pdf.set_font("Arial", '', 9)
-        # Clean and add content (truncate if too long)
-        clean_content = content[:2000] if len(content) > 2000 else content
-        pdf.multi_cell(0, 5, clean_content.encode('latin-1', 'replace').decode('latin-1'))
-        pdf.ln(5)
-    
-    return pdf.output(dest='S').encode('latin-1')
-
-def export_to_markdown(project_info, analyses):
-    """Export analysis to Markdown"""
+    buffer = io.BytesIO()
+    with StreamingPDFWriter(buffer, title=f"Project Analysis: {project_info['name']}") as writer:
+        # Title
+        writer.text(f"Project Analysis: {project_info['name']}", size=16, bold=True, line_height=10, align="C")
+        writer.ln(10)
+        
+        # Project Details
+        writer.text("Project Details", size=12, bold=True, line_height=10)
+        writer.text(f"Type: {project_info['type']}\nBudget: {project_info['budget']}\nTimeline: {project_info['timeline']}\nPriority: {project_info['priority']}")
+        writer.ln(5)
+        
+        # Charts, when static image export is available
+        for title, image in report_chart_images(project_info):
+            writer.text(title, size=12, bold=True, line_height=10)
+            writer.image_jpeg(image)
+            writer.ln(5)
+        
+        # Add each analysis
+        for agent, content in analyses.items():
+            writer.text(agent, size=12, bold=True, line_height=10)
+            # Truncate long analyses; the full report export keeps everything
+            clean_content = content[:2000] if len(content) > 2000 else content
+            writer.text(clean_content, size=9)
+            writer.ln(5)
+    
+    return buffer.getvalue()
+
+def export_to_markdown(project_info, analyses, chart_links=None):
+    """Export analysis to Markdown, with (title, image URL or relative path) chart_links when given"""
     md_content = f"""# Project Analysis: {project_info['name']}
 
 ## Project Details
@@ -542,84 +2244,657 @@ def export_to_markdown(project_info, analyses):
 
 """
     
+    if chart_links:
+        md_content += "## Charts\n\n"
+        for title, link in chart_links:
+            md_content += f"![{title}]({link})\n\n"
+        md_content += "---\n\n"
+    
     for agent, content in analyses.items():
         md_content += f"## {agent}\n\n{content}\n\n---\n\n"
     
     return md_content
 
-def chat_with_agent(client, agent_role, project_info, user_question, chat_history):
-    """Interactive chat with specific agent"""
-    prompts = {
-        "ceo": "You are an experienced CEO providing strategic insights.",
-        "cto": "You are a senior technical architect providing technical guidance.",
-        "pm": "You are an experienced product manager providing product strategy.",
-        "developer": "You are a lead developer providing implementation advice.",
-        "client_manager": "You are a client success manager providing marketing insights."
-    }
+def export_markdown_download(project_info, analyses):
+    """Markdown download, with the charts embedded as data URIs when AGENCY_MARKDOWN_CHARTS=1"""
+    chart_links = None
+    if MARKDOWN_EMBED_CHARTS:
+        chart_links = [(title, f"data:image/png;base64,{base64.b64encode(image).decode('ascii')}")
+                       for title, image in report_chart_images(project_info, image_format="png")]
+    return export_to_markdown(project_info, analyses, chart_links)
+
+def export_to_json(project_info, analyses):
+    """Export analysis to JSON"""
+    return json.dumps({
+        "project_info": project_info,
+        "analyses": analyses
+    }, indent=2)
+
+# ============ RENDERED CHART IMAGES ============
+def find_chart_browser():
+    """Path of the Chromium-based browser kaleido renders with, or None"""
+    try:
+        from choreographer.browsers.chromium import Chromium
+        return Chromium.find_browser(skip_local=False)
+    except Exception:
+        return None
+
+class ImageCache:
+    """Rendered chart images keyed by the chart's figure-cache inputs and output options.
+
+    Renders go through one kaleido browser process kept alive for the life of this process
+    instead of a browser started per image. Images live in a byte-capped in-memory LRU and,
+    with a cache directory, on disk where export worker processes share them.
+    """
+
+    def __init__(self, max_bytes=IMAGE_CACHE_MAX_BYTES, cache_dir=IMAGE_CACHE_DIR):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._available = None
+        self._started = False
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._render_lock = threading.Lock()
+        # Part of every key, so images rendered by another plotly version are not reused
+        self._plotly_version = importlib.metadata.version("plotly")
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def make_key(self, kind, args, image_format, width, height):
+        """Key from the same inputs the figure cache builds the chart from, without serializing the figure"""
+        material = json.dumps([FIGURE_CACHE_VERSION, self._plotly_version, kind, figure_key(kind, args),
+                               image_format, width, height])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    @property
+    def available(self):
+        """Whether kaleido and a browser are present; checked once, since starting without one hangs"""
+        if self._available is None:
+            self._available = importlib.util.find_spec("kaleido") is not None and find_chart_browser() is not None
+        return self._available
+
+    def _start_renderer(self):
+        import kaleido
+        kaleido.start_sync_server(silence_warnings=True)
+        atexit.register(kaleido.stop_sync_server, silence_warnings=True)
+
+    def render(self, kind, args=(), image_format="png", width=CHART_IMAGE_WIDTH, height=CHART_IMAGE_HEIGHT):
+        """Return the `kind` chart built from `args` as image bytes, rendering it only the first time"""
+        key = self.make_key(kind, args, image_format, width, height)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        
+        path = os.path.join(self.cache_dir, f"{key}.{image_format}") if self.cache_dir else None
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                data = f.read()
+        else:
+            if not self.available:
+                return None
+            try:
+                fig = get_figure_cache().get(kind, *args)
+                # One render at a time through the shared browser process
+                with self._render_lock:
+                    if not self._started:
+                        self._start_renderer()
+                        self._started = True
+                    data = fig.to_image(format=image_format, width=width, height=height)
+            except Exception:
+                return None
+            if path:
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+        
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = data
+                self.size += len(data)
+            while self.size > self.max_bytes and len(self._entries) > 1:
+                _, old_data = self._entries.popitem(last=False)
+                self.size -= len(old_data)
+        return data
+
+@st.cache_resource
+def get_image_cache():
+    """Shared rendered-image cache for this process"""
+    return ImageCache()
+
+# ============ FULL REPORT EXPORT ============
+REPORT_CHARTS = [
+    ("success_score", "Success Score Breakdown"),
+    ("budget", "Estimated Budget Breakdown"),
+    ("timeline", "Project Timeline"),
+    ("risk", "Risk Assessment Matrix")
+]
+
+def report_figure_args(kind, project_info):
+    """Figure-cache inputs of the dashboard chart used in a report section"""
+    if kind == "success_score":
+        return (calculate_success_score(project_info),)
+    if kind == "budget":
+        return (project_info['budget'],)
+    if kind == "timeline":
+        return (project_info['timeline'],)
+    return ()
+
+def render_report_chart(kind, project_info, image_format="jpeg"):
+    """Render a report chart to image bytes, or None if static export is unavailable"""
+    return get_image_cache().render(kind, report_figure_args(kind, project_info), image_format)
+
+def report_chart_images(project_info, image_format="jpeg"):
+    """(title, image bytes) for every report chart that could be rendered"""
+    charts = []
+    for kind, title in REPORT_CHARTS:
+        image = render_report_chart(kind, project_info, image_format)
+        if image:
+            charts.append((title, image))
+    return charts
+
+def write_project_report(writer, project_info, analyses, chart_images=None):
+    """Lay out one complete project report (untruncated analyses plus chart images) on a PDF writer"""
+    writer.add_page()
+    writer.text(f"Project Analysis: {project_info['name']}", size=16, bold=True, line_height=10, align="C")
+    writer.ln(10)
+    
+    writer.text("Project Details", size=12, bold=True, line_height=10)
+    writer.text(f"Type: {project_info['type']}\nBudget: {project_info['budget']}\n"
+                f"Timeline: {project_info['timeline']}\nPriority: {project_info['priority']}\n\n"
+                f"Description: {project_info['description']}")
+    writer.ln(5)
+    
+    score = calculate_success_score(project_info)
+    writer.text(f"Success Score: {score['total_score']}/100 ({score['level']})", size=12, bold=True, line_height=10)
+    for category, data in score['breakdown'].items():
+        writer.text(f"{category}: {data['score']}/{data['max']} - {data['reason']}")
+    writer.ln(5)
+    
+    for title, image in chart_images or []:
+        writer.text(title, size=12, bold=True, line_height=10)
+        writer.image_jpeg(image)
+        writer.ln(5)
     
+    for agent, content in analyses.items():
+        writer.add_page()
+        writer.text(agent, size=12, bold=True, line_height=10)
+        writer.text(content, size=9)
+
+def write_pdf_report(sink, project_info, analyses, chart_images=None):
+    """Stream a complete PDF report to a path or binary file-like sink"""
+    with StreamingPDFWriter(sink, title=f"Project Analysis: {project_info['name']}") as writer:
+        write_project_report(writer, project_info, analyses, chart_images)
+    return sink
+
+def write_portfolio_report(sink, entries, title="Project Portfolio"):
+    """Stream one PDF covering many projects; entries are (project_info, analyses, chart_images) and may be a generator"""
+    with StreamingPDFWriter(sink, title=title) as writer:
+        for project_info, analyses, chart_images in entries:
+            write_project_report(writer, project_info, analyses, chart_images)
+    return sink
+
+# ============ EXPORT CACHE ============
+EXPORT_BUILDERS = {
+    "pdf": export_to_pdf,
+    "md": export_markdown_download,
+    "json": export_to_json
+}
+
+class ExportCache:
+    """Bounded LRU of generated export files keyed by a hash of their inputs, with optional spill to disk"""
+
+    def __init__(self, max_bytes=EXPORT_CACHE_MAX_BYTES, spill_dir=EXPORT_SPILL_DIR):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(kind, project_info, analyses):
+        material = json.dumps([kind, project_info, analyses], sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _spill_path(self, key):
+        return os.path.join(self.spill_dir, key)
+
+    def get(self, kind, project_info, analyses):
+        """Return the export as bytes, building it only the first time these inputs are seen"""
+        key = self.make_key(kind, project_info, analyses)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        
+        if self.spill_dir and os.path.exists(self._spill_path(key)):
+            with open(self._spill_path(key), "rb") as f:
+                data = f.read()
+        else:
+            data = EXPORT_BUILDERS[kind](project_info, analyses)
+            if isinstance(data, str):
+                data = data.encode("utf-8")
+        self._put(key, data)
+        return data
+
+    def _put(self, key, data):
+        evicted = []
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes and len(self._entries) > 1:
+                old_key, old_data = self._entries.popitem(last=False)
+                self.size -= len(old_data)
+                evicted.append((old_key, old_data))
+        if self.spill_dir:
+            for old_key, old_data in evicted:
+                if not os.path.exists(self._spill_path(old_key)):
+                    with open(self._spill_path(old_key), "wb") as f:
+                        f.write(old_data)
+
+@st.cache_resource
+def get_export_cache():
+    """Shared export cache for this process"""
+    return ExportCache()
+
+# ============ BACKGROUND REPORT EXPORTS ============
+@st.cache_resource
+def get_export_jobs():
+    """Shared background export worker pool for this process"""
+    from export_jobs import ExportJobManager
+    return ExportJobManager(EXPORT_JOB_DIR, workers=EXPORT_WORKERS, chart_kinds=REPORT_CHARTS,
+                            max_jobs=EXPORT_JOB_HISTORY)
+
+def report_entry(project):
+    """(project_info, analyses) pair for a stored project"""
+    return {field: project[field] for field in ProjectStore.PROJECT_FIELDS}, project['analyses']
+
+def read_export_job(export_jobs, job_id):
+    """Download data of a finished export job, failing with a readable message once the job has been pruned"""
+    data = export_jobs.read_artifact(job_id)
+    if data is None:
+        raise FileNotFoundError("This report is no longer available; please export it again")
+    return data
+
+@st.fragment(run_every=EXPORT_JOB_POLL_SECONDS)
+def show_export_jobs():
+    """Job list with progress, refreshed on its own while exports run"""
+    export_jobs = get_export_jobs()
+    for job in export_jobs.jobs(current_user_id()):
+        st.markdown(f"**{job.label}**")
+        if job.status == "done":
+            st.download_button(
+                "📥 Download PDF",
+                data=lambda job_id=job.id: read_export_job(export_jobs, job_id),
+                file_name=os.path.basename(job.path),
+                mime="application/pdf",
+                on_click="ignore",
+                key=f"export_job_{job.id}",
+                use_container_width=True
+            )
+            for note in job.notes:
+                st.caption(note)
+        elif job.status == "failed":
+            st.error(f"Export failed: {job.error}")
+        else:
+            st.progress(job.progress, text=f"{job.status.title()} ({job.done_steps}/{job.total_steps})")
+
+# ============ CHAT MEMORY ============
+CHAT_PROMPTS = {
+    "ceo": "You are an experienced CEO providing strategic insights.",
+    "cto": "You are a senior technical architect providing technical guidance.",
+    "pm": "You are an experienced product manager providing product strategy.",
+    "developer": "You are a lead developer providing implementation advice.",
+    "client_manager": "You are a client success manager providing marketing insights."
+}
+
+def estimate_text_tokens(text):
+    """Rough token count of a text, ~4 characters per token like estimate_request_tokens"""
+    return len(text) // 4
+
+class ChatMemory:
+    """One agent conversation: recent turns sent verbatim, older turns folded into a running summary"""
+
+    def __init__(self):
+        self.turns = []
+        self.summary = ""
+        # Turns before this index are covered by the summary
+        self.summarized = 0
+        # Summarized turns no longer held, so a long conversation keeps a bounded footprint
+        self.dropped = 0
+        # Turns discarded before they could be summarized (while summarizing kept failing)
+        self.lost = 0
+
+    def add_turn(self, question, answer, max_turns=CHAT_TURNS_KEPT):
+        self.turns.append({'question': question, 'answer': answer})
+        drop = len(self.turns) - max_turns
+        if drop > 0:
+            # Summarized turns go first; unsummarized ones only when summarizing keeps failing, so the
+            # buffer and the next summary request stay bounded (the previous summary is kept)
+            del self.turns[:drop]
+            self.dropped += min(drop, self.summarized)
+            self.lost += max(0, drop - self.summarized)
+            self.summarized = max(0, self.summarized - drop)
+
+    def window_start(self, token_budget=CHAT_HISTORY_TOKEN_BUDGET, max_turns=CHAT_RECENT_TURNS):
+        """Index of the oldest turn that still fits the verbatim window (the newest turn always does)"""
+        start, used = len(self.turns), 0
+        while start > self.summarized and len(self.turns) - start < max_turns:
+            turn = self.turns[start - 1]
+            cost = estimate_text_tokens(turn['question']) + estimate_text_tokens(turn['answer'])
+            if used + cost > token_budget and start < len(self.turns):
+                break
+            used += cost
+            start -= 1
+        return start
+
+def build_summary_request(summary, turns):
+    """Request folding new exchanges into the existing running summary"""
+    exchanges = "\n".join(f"Q: {turn['question']}\nA: {turn['answer']}" for turn in turns)
+    return {
+        "model": "gpt-4o-mini",
+        "messages": [
+            {"role": "system", "content": "You maintain a running summary of a consulting conversation. "
+                                          "Update the summary with the new exchanges, keeping facts, decisions, "
+                                          "numbers and open questions. Reply with the updated summary only, "
+                                          "in at most 200 words."},
+            {"role": "user", "content": f"Current summary:\n{summary or '(none yet)'}\n\nNew exchanges:\n{exchanges}"}
+        ],
+        "temperature": 0.2,
+        "max_tokens": CHAT_SUMMARY_MAX_TOKENS
+    }
+
+def update_chat_summary(client, memory, fold_end):
+    """Fold turns[memory.summarized:fold_end] into the summary with one incremental model call"""
+    request = build_summary_request(memory.summary, memory.turns[memory.summarized:fold_end])
+    cache = get_response_cache()
+    cache_key = ResponseCache.make_key("chat_summary", request)
+    summary = cache.get(cache_key)
+    if summary is not None:
+        get_llm_telemetry().record_cache_hit("summary", request)
+    else:
+        try:
+            response = get_request_scheduler().create(client, request, "summary", PRIORITY_INTERACTIVE)
+            summary = response.choices[0].message.content
+        except Exception:
+            return False
+        if not summary:
+            return False
+        cache.set(cache_key, "chat_summary", summary)
+    memory.summary = summary
+    memory.summarized = fold_end
+    return True
+
+def prepare_chat_history(client, memory):
+    """(summary, recent turns) that fit the chat token budget, summarizing turns that fell out of the window"""
+    start = memory.window_start()
+    if start > memory.summarized:
+        # Fold a little past the window so the summary is refreshed every few turns, not on every turn
+        fold_end = max(start, len(memory.turns) - CHAT_TURNS_KEPT_AFTER_SUMMARY)
+        update_chat_summary(client, memory, fold_end)
+    # If summarizing failed, the dropped turns are simply left out of this request
+    return memory.summary, memory.turns[max(start, memory.summarized):]
+
+def build_chat_request(agent_role, project_info, user_question, summary="", recent_turns=(), analysis=None):
+    """Build the chat completion request for a follow-up question to an agent"""
     context = f"""Project Context:
 Name: {project_info['name']}
 Type: {project_info['type']}
 Budget: {project_info['budget']}
-Timeline: {project_info['timeline']}
-
-Previous conversation:
-{chat_history}
-
-User question: {user_question}
-
-Provide a helpful, specific answer based on your expertise as {agent_role}."""
+Timeline: {project_info['timeline']}"""
+    if analysis:
+        # Keep the head of long analyses; it carries the summary and key recommendations
+        context += f"\n\nYour original analysis of this project:\n{analysis[:CHAT_ANALYSIS_TOKEN_LIMIT * 4]}"
+    if summary:
+        context += f"\n\nSummary of the earlier conversation:\n{summary}"
+    
+    messages = [{"role": "system", "content": f"{CHAT_PROMPTS.get(agent_role, 'You are a helpful assistant.')}\n\n{context}"}]
+    for turn in recent_turns:
+        messages.append({"role": "user", "content": turn['question']})
+        messages.append({"role": "assistant", "content": turn['answer']})
+    messages.append({"role": "user", "content": f"{user_question}\n\nProvide a helpful, specific answer based on your expertise as {agent_role}."})
     
+    return {
+        "model": "gpt-4o-mini",
+        "messages": messages,
+        "temperature": 0.4,
+        "max_tokens": 1000
+    }
+
+def chat_with_agent(client, agent_role, project_info, user_question, memory, analysis=None):
+    """Interactive chat with specific agent"""
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": prompts.get(agent_role, "You are a helpful assistant.")},
-                {"role": "user", "content": context}
-            ],
-            temperature=0.4,
-            max_tokens=1000
-        )
+        summary, recent_turns = prepare_chat_history(client, memory)
+        request = build_chat_request(agent_role, project_info, user_question, summary, recent_turns, analysis)
+        response = get_request_scheduler().create(client, request, "chat", PRIORITY_INTERACTIVE)
         return response.choices[0].message.content
     except Exception as e:
         return f"Error: {str(e)}"
 
-def suggest_project_type(description, client):
-    """AI-powered project type suggestion"""
+def stream_chat_with_agent(client, agent_role, project_info, user_question, memory, analysis=None):
+    """Interactive chat with specific agent, yielding the answer as it streams in"""
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a project classifier. Analyze the description and suggest ONE project type from: Web Application, Mobile App, API Development, Data Analytics, AI/ML Solution, Other. Reply with ONLY the type name."},
-                {"role": "user", "content": f"Project description: {description}"}
-            ],
-            temperature=0.3,
-            max_tokens=50
-        )
-        return response.choices[0].message.content.strip()
-    except:
-        return None
+        summary, recent_turns = prepare_chat_history(client, memory)
+        request = build_chat_request(agent_role, project_info, user_question, summary, recent_turns, analysis)
+        stream = get_request_scheduler().create(client, request, "chat", PRIORITY_INTERACTIVE, stream=True)
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    except Exception as e:
+        yield f"Error: {str(e)}"
+
+# ============ AI WIZARD SUGGESTION CACHE ============
+def normalize_description(description):
+    """Normalize description text so whitespace and case changes share one suggestion"""
+    return " ".join(description.lower().split())
 
-def estimate_budget(description, project_type, client):
-    """AI-powered budget estimation"""
+@st.cache_data(max_entries=SUGGESTION_CACHE_SIZE, ttl=SUGGESTION_CACHE_TTL, show_spinner=False)
+def _fetch_project_suggestions(normalized_description, _description, _client):
+    """Classify project type and budget in one structured call (raises on failure so errors are not cached)
+
+    Cached by the normalized text, but the model sees the description as typed, so case such as
+    "iOS" or "AWS" still reaches the classifier.
+    """
+    response = get_request_scheduler().create(_client, {
+        "model": "gpt-4o-mini",
+        "messages": [
+            {"role": "system", "content": "You are a project classifier and budget estimator. "
+                                          f"Pick ONE project type from: {', '.join(PROJECT_TYPE_OPTIONS)}. "
+                                          f"Pick ONE budget range from: {', '.join(BUDGET_OPTIONS)}. "
+                                          'Reply with ONLY a JSON object like {"type": "...", "budget": "..."}.'},
+            {"role": "user", "content": f"Project description: {_description}"}
+        ],
+        "response_format": {"type": "json_object"},
+        "temperature": 0.3,
+        "max_tokens": 60
+    }, "suggest", PRIORITY_INTERACTIVE)
+    data = json.loads(response.choices[0].message.content)
+    return {
+        "type": data.get("type") if data.get("type") in PROJECT_TYPE_OPTIONS else None,
+        "budget": data.get("budget") if data.get("budget") in BUDGET_OPTIONS else None
+    }
+
+def get_project_suggestions(description, client):
+    """Memoized AI type and budget suggestions that only refresh when the description text changes"""
+    suggestion_key = normalize_description(description)
+    if st.session_state.get('suggestion_key') == suggestion_key:
+        return st.session_state.suggestions
+    
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a budget estimator. Suggest ONE budget range from: $10k-$25k, $25k-$50k, $50k-$100k, $100k+. Reply with ONLY the range."},
-                {"role": "user", "content": f"Project: {project_type}\nDescription: {description}"}
-            ],
-            temperature=0.3,
-            max_tokens=50
-        )
-        return response.choices[0].message.content.strip()
-    except:
-        return None
+        suggestions = _fetch_project_suggestions(suggestion_key, description, client)
+    except Exception:
+        # Remembered like a success, so reruns with the same text do not repeat the failing call
+        suggestions = {"type": None, "budget": None}
+    
+    st.session_state.suggestion_key = suggestion_key
+    st.session_state.suggestions = suggestions
+    return suggestions
+
+# ============ RERUN PROFILING ============
+class RerunProfiler:
+    """Named timing spans for one rerun of main(), with an optional cProfile or pyinstrument capture.
+
+    Top-level phases are marked sequentially with phase(), so main() stays flat; span() times a
+    nested block inside the current phase. A disabled profiler makes both calls no-ops.
+    """
+
+    def __init__(self, mode=None, dump_dir=PROFILE_DIR):
+        self.mode = mode
+        self.enabled = bool(mode)
+        self.dump_dir = dump_dir
+        self.dump_path = None
+        self.note = None
+        self.spans = []
+        self._depth = 0
+        self._phase = None
+        self._profiler = None
+        self._started = time.perf_counter()
+        if mode == "cprofile":
+            self._profiler = cProfile.Profile()
+            try:
+                self._profiler.enable()
+            except ValueError:
+                # Another profiler (a debugger, a cProfile run of the whole server) is already active
+                self._profiler = None
+                self.note = "cProfile unavailable: another profiler is active"
+        elif mode == "pyinstrument":
+            if importlib.util.find_spec("pyinstrument") is None:
+                self.note = "pyinstrument is not installed; timing spans only"
+            else:
+                from pyinstrument import Profiler
+                self._profiler = Profiler()
+                self._profiler.start()
+
+    def _add(self, name, start, end, depth):
+        self.spans.append({"name": name, "start": start - self._started, "duration": end - start, "depth": depth})
+
+    def phase(self, name):
+        """End the current top-level phase and start the next one"""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self._phase:
+            self._add(*self._phase, now, 0)
+        self._phase = (name, now)
+
+    @contextlib.contextmanager
+    def span(self, name):
+        """Time a nested block within the current phase"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            self._add(name, start, time.perf_counter(), self._depth + 1)
+
+    @property
+    def total(self):
+        return sum(span["duration"] for span in self.spans if span["depth"] == 0)
+
+    def finish(self):
+        """Close the last phase and write the profiler dump, if any"""
+        if not self.enabled:
+            return
+        self.phase(None)
+        if self._profiler is None:
+            return
+        os.makedirs(self.dump_dir, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        if self.mode == "cprofile":
+            self._profiler.disable()
+            self.dump_path = os.path.join(self.dump_dir, f"rerun-{stamp}.prof")
+            self._profiler.dump_stats(self.dump_path)
+        else:
+            self._profiler.stop()
+            self.dump_path = os.path.join(self.dump_dir, f"rerun-{stamp}.html")
+            with open(self.dump_path, "w", encoding="utf-8") as f:
+                f.write(self._profiler.output_html())
+        self._prune_dumps()
+
+    def _prune_dumps(self):
+        dumps = sorted((entry for entry in os.scandir(self.dump_dir) if entry.name.startswith("rerun-")),
+                       key=lambda entry: entry.stat().st_mtime)
+        for entry in dumps[:max(0, len(dumps) - PROFILE_DUMPS_KEPT)]:
+            os.remove(entry.path)
+
+def start_rerun_profiler():
+    """Profiler for this rerun; enabled by ?profile= in the URL or the AGENCY_PROFILE env var"""
+    mode = (st.query_params.get("profile") or PROFILE_MODE).lower()
+    if mode in ("", "0", "off", "false"):
+        return RerunProfiler()
+    return RerunProfiler(mode if mode in ("cprofile", "pyinstrument") else "spans")
+
+def create_profile_waterfall(profiler):
+    """Horizontal waterfall of the rerun's spans in start order"""
+    spans = sorted(profiler.spans, key=lambda span: (span["start"], span["depth"]))
+    labels = [("   " * span["depth"]) + span["name"] for span in spans]
+    fig = go.Figure(go.Bar(
+        y=labels,
+        x=[span["duration"] * 1000 for span in spans],
+        base=[span["start"] * 1000 for span in spans],
+        orientation='h',
+        marker_color=['#667eea' if span["depth"] == 0 else '#f093fb' for span in spans],
+        text=[f"{span['duration'] * 1000:.1f} ms" for span in spans],
+        textposition='outside'
+    ))
+    fig.update_layout(
+        title=f"Rerun Waterfall ({profiler.total * 1000:.0f} ms)",
+        xaxis_title="Milliseconds since rerun start",
+        yaxis=dict(autorange="reversed"),
+        height=max(300, 28 * len(spans) + 120)
+    )
+    return fig
+
+def show_rerun_profile(profiler):
+    """Waterfall of this rerun and per-phase timings of the recent reruns in this session"""
+    if not profiler.enabled:
+        return
+    recent = st.session_state.setdefault('rerun_profiles', [])
+    recent.append({"rerun": datetime.now().strftime("%H:%M:%S"), "total ms": round(profiler.total * 1000, 1),
+                   **{span["name"]: round(span["duration"] * 1000, 1)
+                      for span in profiler.spans if span["depth"] == 0}})
+    del recent[:-PROFILE_RERUNS_KEPT]
+    
+    with st.expander(f"⏱️ Rerun Profile — {profiler.total * 1000:.0f} ms", expanded=False):
+        st.plotly_chart(create_profile_waterfall(profiler), use_container_width=True)
+        st.markdown("**Recent reruns (ms per phase)**")
+        st.dataframe(pd.DataFrame(recent[::-1]), hide_index=True, use_container_width=True)
+        if profiler.dump_path:
+            st.caption(f"Profile written to {profiler.dump_path}")
+        if profiler.note:
+            st.caption(profiler.note)
 
 def main():
     st.set_page_config(page_title="AI Services Agency", layout="wide", page_icon="🚀", initial_sidebar_state="expanded")
+    profiler = start_rerun_profiler()
+    try:
+        render_app(profiler)
+    finally:
+        profiler.finish()
+    show_rerun_profile(profiler)
+
+def render_app(profiler):
+    """One rerun of the app, with each phase marked on `profiler`"""
+    profiler.phase("session & caches")
     init_session_state()
+    # Warmed on the first run so dashboards never build figures while a user waits
+    figure_cache = get_figure_cache()
     
+    profiler.phase("custom css")
     # ============ CUSTOM CSS FOR DARK THEME & ANIMATIONS ============
     st.markdown("""
     <style>
@@ -888,11 +3163,13 @@ def main():
     </style>
     """, unsafe_allow_html=True)
     
+    profiler.phase("title")
     # ============ ANIMATED TITLE & SUBTITLE ============
     st.markdown('<h1 class="animated-title">🤖TechSeva AI Services Agency 🧑‍💻</h1>', unsafe_allow_html=True)
     st.markdown('<h2 class="animated-subtitle">💎 Enterprise-Grade Multi-Agent Analysis Platform | Transform Ideas into Actionable Roadmaps</h2>', unsafe_allow_html=True)
     st.markdown("<br>", unsafe_allow_html=True)
     
+    profiler.phase("sidebar")
     # API Configuration
     with st.sidebar:
         # Logo at the top of sidebar
@@ -939,12 +3216,16 @@ def main():
         st.markdown("---")
         st.subheader("📊 Live Analytics")
         
-        if st.session_state.project_history:
-            # Calculate stats
-            total_projects = len(st.session_state.project_history)
-            avg_score = sum([p.get('success_score', 0) for p in st.session_state.project_history]) / total_projects if total_projects > 0 else 0
-            total_ratings = sum([p.get('rating', 0) for p in st.session_state.project_history])
-            avg_rating = total_ratings / total_projects if total_projects > 0 else 0
+        # In server mode every user sees only their own history and exports
+        project_store = get_project_store()
+        owner = current_user_id()
+        history_stats = project_store.stats(owner)
+        
+        if history_stats['total_projects']:
+            # Read stats from the store's running aggregates
+            total_projects = history_stats['total_projects']
+            avg_score = history_stats['avg_score']
+            avg_rating = history_stats['avg_rating']
             
             # Display metrics
             col1, col2 = st.columns(2)
@@ -961,10 +3242,8 @@ def main():
             st.markdown(f"**Avg Rating:** {'⭐' * int(avg_rating)} ({avg_rating:.1f}/5)")
             
             # Most used project type
-            project_types = [p.get('type', 'Unknown') for p in st.session_state.project_history]
-            if project_types:
-                most_common = max(set(project_types), key=project_types.count)
-                st.markdown(f"**Top Category:** {most_common}")
+            if history_stats['top_type']:
+                st.markdown(f"**Top Category:** {history_stats['top_type']}")
         else:
             st.info("📊 Analytics will appear after your first project analysis")
         
@@ -972,7 +3251,7 @@ def main():
         st.markdown("---")
         st.subheader("⚡ Quick Actions")
         
-        if st.session_state.project_history:
+        if history_stats['total_projects']:
             if st.button("🔄 Repeat Last Project", use_container_width=True):
                 st.info("💡 Use the form above to repeat analysis with the last project data")
             
@@ -988,8 +3267,8 @@ def main():
         st.markdown("---")
         st.subheader("🏆 Achievements")
         
-        if st.session_state.project_history:
-            total_projects = len(st.session_state.project_history)
+        if history_stats['total_projects']:
+            total_projects = history_stats['total_projects']
             
             # Determine user level
             if total_projects >= 20:
@@ -1032,39 +3311,74 @@ def main():
         # Project History & Comparison
         st.markdown("---")
         st.subheader("📚 Project History")
-        if st.session_state.project_history:
-            st.write(f"**{len(st.session_state.project_history)} projects analyzed**")
+        if history_stats['total_projects']:
+            st.write(f"**{history_stats['total_projects']} projects analyzed**")
             
             if st.button("🔍 Compare Projects", use_container_width=True):
                 st.session_state.show_comparison = True
             
+            # Reopen a saved analysis; its tabs, chat and exports are rebuilt from history without model calls
+            saved_projects = {p['id']: f"{p['name']} ({p['timestamp']})" for p in project_store.recent(10, owner) if p['analyses']}
+            if saved_projects:
+                st.selectbox(
+                    "📂 Open Saved Analysis",
+                    [None] + list(saved_projects),
+                    format_func=lambda project_id: saved_projects.get(project_id, "—"),
+                    key="open_analysis",
+                    on_change=lambda: st.session_state.update(last_project_id=st.session_state.open_analysis)
+                    if st.session_state.open_analysis else None
+                )
+            
             if st.button("📜 View History", use_container_width=True):
                 with st.expander("Previous Projects", expanded=True):
-                    for idx, proj in enumerate(reversed(st.session_state.project_history[-5:])):
+                    for idx, proj in enumerate(project_store.recent(5, owner)):
                         rating_stars = "⭐" * proj.get('rating', 0) if proj.get('rating') else "Not rated"
-                        success_score = proj.get('success_score', 'N/A')
+                        success_score = proj['success_score'] if proj.get('success_score') is not None else 'N/A'
                         st.markdown(f"**{idx+1}. {proj['name']}** ({proj['type']})")
                         st.markdown(f"   📊 Score: {success_score}/100 | {rating_stars}")
                         st.markdown(f"   🕐 {proj.get('timestamp', 'N/A')}")
                         st.markdown("---")
         else:
             st.info("No projects analyzed yet")
+        
+        # Full reports are rendered in background worker processes
+        st.markdown("---")
+        st.subheader("🖨️ Report Exports")
+        if history_stats['total_projects']:
+            last_project = get_active_analysis(project_store)
+            if last_project:
+                if st.button("📄 Full Report for Last Project", use_container_width=True):
+                    get_export_jobs().submit([report_entry(last_project)], f"{last_project['name']} report",
+                                             owner=owner)
+            
+            if st.button("🗃️ Export Recent History", use_container_width=True):
+                entries = [report_entry(p) for p in project_store.recent(HISTORY_EXPORT_LIMIT, owner) if p['analyses']]
+                if entries:
+                    get_export_jobs().submit(entries, f"History export ({len(entries)} projects)", owner=owner)
+                else:
+                    st.info("No saved analyses to export yet")
+            
+            show_export_jobs()
+        else:
+            st.info("🖨️ Full PDF reports will be available after your first analysis")
     
+    profiler.phase("project comparison")
     # Project Comparison View
-    if st.session_state.get('show_comparison', False) and len(st.session_state.project_history) >= 2:
+    if st.session_state.get('show_comparison', False) and history_stats['total_projects'] >= 2:
         st.subheader("🔍 Project Comparison")
         
+        comparison_projects = project_store.recent(COMPARISON_PROJECT_LIMIT, owner)
         col1, col2 = st.columns(2)
         with col1:
-            proj1_idx = st.selectbox("Select Project 1", range(len(st.session_state.project_history)), 
-                                      format_func=lambda x: st.session_state.project_history[x]['name'])
+            proj1_idx = st.selectbox("Select Project 1", range(len(comparison_projects)), 
+                                      format_func=lambda x: comparison_projects[x]['name'])
         with col2:
-            proj2_idx = st.selectbox("Select Project 2", range(len(st.session_state.project_history)), 
-                                      format_func=lambda x: st.session_state.project_history[x]['name'])
+            proj2_idx = st.selectbox("Select Project 2", range(len(comparison_projects)), 
+                                      format_func=lambda x: comparison_projects[x]['name'])
         
         if proj1_idx != proj2_idx:
-            proj1 = st.session_state.project_history[proj1_idx]
-            proj2 = st.session_state.project_history[proj2_idx]
+            proj1 = comparison_projects[proj1_idx]
+            proj2 = comparison_projects[proj2_idx]
             
             comparison_df = {
                 "Attribute": ["Type", "Budget", "Timeline", "Priority"],
@@ -1079,6 +3393,7 @@ def main():
         
         st.markdown("---")
     
+    profiler.phase("project form")
     # Project Input Form with AI Wizard
     with st.form("project_form"):
         st.subheader("📋 Project Details (AI-Powered Wizard)")
@@ -1127,23 +3442,23 @@ def main():
         
         # AI Suggestions
         if project_description and len(project_description) > 20:
-            client = OpenAI(api_key=st.session_state.api_key)
+            client = get_openai_client(st.session_state.api_key)
+            
+            with profiler.span("ai wizard suggestions"):
+                suggestions = get_project_suggestions(project_description, client)
             
             col_suggest1, col_suggest2 = st.columns(2)
             with col_suggest1:
-                suggested_type = suggest_project_type(project_description, client)
-                if suggested_type:
-                    st.success(f"💡 AI Suggests Type: {suggested_type}")
+                if suggestions['type']:
+                    st.success(f"💡 AI Suggests Type: {suggestions['type']}")
             
             with col_suggest2:
-                suggested_budget = estimate_budget(project_description, suggested_type or "Web Application", client)
-                if suggested_budget:
-                    st.success(f"💰 AI Suggests Budget: {suggested_budget}")
+                if suggestions['budget']:
+                    st.success(f"💰 AI Suggests Budget: {suggestions['budget']}")
         
         col1, col2 = st.columns(2)
         with col1:
-            type_options = ["Web Application", "Mobile App", "API Development", 
-                           "Data Analytics", "AI/ML Solution", "Other"]
+            type_options = PROJECT_TYPE_OPTIONS
             default_type_idx = type_options.index(template_data.get('type', 'Web Application')) if template_data.get('type') in type_options else 0
             
             project_type = st.selectbox(
@@ -1152,7 +3467,7 @@ def main():
                 index=default_type_idx
             )
             
-            timeline_options = ["1-2 months", "3-4 months", "5-6 months", "6+ months"]
+            timeline_options = TIMELINE_OPTIONS
             default_timeline_idx = timeline_options.index(template_data.get('timeline', '3-4 months')) if template_data.get('timeline') in timeline_options else 1
             
             timeline = st.selectbox(
@@ -1162,7 +3477,7 @@ def main():
             )
         
         with col2:
-            budget_options = ["$10k-$25k", "$25k-$50k", "$50k-$100k", "$100k+"]
+            budget_options = BUDGET_OPTIONS
             default_budget_idx = budget_options.index(template_data.get('budget', '$50k-$100k')) if template_data.get('budget') in budget_options else 2
             
             budget_range = st.selectbox(
@@ -1195,11 +3510,12 @@ def main():
         
         submitted = st.form_submit_button("🚀 Analyze Project", use_container_width=True)
     
+    # A submit starts a new analysis; any other rerun rehydrates the active one from history
+    new_analysis = bool(submitted and project_name and project_description)
+    active_project = None if new_analysis else get_active_analysis(project_store)
+    
     # Process form submission OUTSIDE the form
-    if submitted and project_name and project_description:
-        # Create OpenAI client
-        client = OpenAI(api_key=st.session_state.api_key)
-        
+    if new_analysis:
         # Prepare project info
         project_info = {
             "name": project_name,
@@ -1213,12 +3529,49 @@ def main():
             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
         
-        # Save to history
-        st.session_state.project_history.append(project_info)
-        
+        profiler.phase("success score")
         # ============ NEW FEATURE 2: CALCULATE SUCCESS SCORE ============
         success_score_data = calculate_success_score(project_info)
         
+        # Re-request only the agents whose prompt inputs differ from the analysis on screen
+        previous_project = get_active_analysis(project_store) if st.session_state.cache_mode != "refresh" else None
+        change_log = None
+        reused = {}
+        if previous_project:
+            previous_info, previous_analyses = report_entry(previous_project)
+            changes, rerun_roles, reused = plan_incremental_analysis(previous_info, previous_analyses, project_info)
+            if reused:
+                change_log = {
+                    "previous": f"{previous_project['name']} ({previous_project['timestamp']})",
+                    "changes": changes,
+                    "rerun": rerun_roles,
+                    "reused": list(reused)
+                }
+        
+        # Save to history
+        project_id = project_store.add_project(project_info, success_score_data['total_score'],
+                                               success_score_data['rules_version'], owner=owner)
+        st.session_state.last_project_id = project_id
+        if change_log:
+            remember(st.session_state.analysis_changes, project_id, change_log, SESSION_CHANGE_LOG_LIMIT)
+        analyses = {AGENT_DISPLAY[role]['label']: text for role, text in reused.items()}
+        saved_rating, saved_feedback = None, None
+    elif active_project:
+        profiler.phase("success score")
+        project_id = active_project['id']
+        project_info, analyses = report_entry(active_project)
+        success_score_data = calculate_success_score(project_info)
+        saved_rating, saved_feedback = active_project['rating'], active_project['feedback']
+        change_log = st.session_state.analysis_changes.get(project_id)
+        reused = {}
+    
+    if new_analysis or active_project:
+        # Shared OpenAI client, only used when a chat question is sent or a new analysis runs
+        client = get_openai_client(st.session_state.api_key)
+        
+        if change_log:
+            show_analysis_changes(change_log, expanded=new_analysis)
+        
         # Create tabs for different analyses
         tabs = st.tabs([
             "🔮 Success Score",
@@ -1231,8 +3584,6 @@ def main():
             "💬 Chat with Agents"
         ])
         
-        analyses = {}
-        
         with st.spinner("🔄 AI Services Agency is analyzing your project..."):
             try:
                 # ============ NEW FEATURE 2: SUCCESS SCORE TAB ============
@@ -1274,7 +3625,7 @@ def main():
                         
                         # Radar chart
                         st.subheader("🎯 Multi-Factor Analysis")
-                        score_chart = create_success_score_chart(success_score_data)
+                        score_chart = figure_cache.get("success_score", success_score_data)
                         st.plotly_chart(score_chart, use_container_width=True)
                         
                         # Improvement suggestions
@@ -1293,76 +3644,83 @@ def main():
                         else:
                             st.success("🎉 Excellent! Your project scores high across all categories!")
                     
-                    # Get CEO Analysis
-                    with tabs[1]:
-                        st.markdown("## CEO's Strategic Analysis")
-                        with st.spinner("Getting CEO's analysis..."):
-                            ceo_response = get_agent_response(client, "ceo", project_info)
-                            st.markdown(ceo_response)
-                            analyses["CEO Analysis"] = ceo_response
-                    
-                    # Get CTO Analysis
-                    with tabs[2]:
-                        st.markdown("## CTO's Technical Specification")
-                        with st.spinner("Getting CTO's technical specs..."):
-                            cto_response = get_agent_response(client, "cto", project_info)
-                            st.markdown(cto_response)
-                            analyses["CTO Technical Specs"] = cto_response
-                    
-                    # Get PM Analysis
-                    with tabs[3]:
-                        st.markdown("## Product Manager's Roadmap")
-                        with st.spinner("Getting Product Manager's roadmap..."):
-                            pm_response = get_agent_response(client, "pm", project_info)
-                            st.markdown(pm_response)
-                            analyses["Product Manager Roadmap"] = pm_response
+                    profiler.phase("agent analyses")
+                    # Agent analyses: one placeholder per tab, filled as each response arrives
+                    agent_placeholders = {}
+                    for tab_idx, role in enumerate(AGENT_ROLES, start=1):
+                        with tabs[tab_idx]:
+                            st.markdown(f"## {AGENT_DISPLAY[role]['title']}")
+                            if change_log and role in change_log['reused']:
+                                st.caption("♻️ Reused from the previous analysis: none of this agent's inputs changed")
+                            agent_placeholders[role] = st.empty()
+                            if new_analysis and role not in reused:
+                                agent_placeholders[role].info(f"⏳ {AGENT_DISPLAY[role]['waiting']}")
+                            else:
+                                agent_placeholders[role].markdown(analyses.get(AGENT_DISPLAY[role]['label'], ""))
                     
-                    # Get Developer Analysis
-                    with tabs[4]:
-                        st.markdown("## Lead Developer's Implementation Plan")
-                        with st.spinner("Getting Developer's plan..."):
-                            dev_response = get_agent_response(client, "developer", project_info)
-                            st.markdown(dev_response)
-                            analyses["Developer Implementation Plan"] = dev_response
-                    
-                    # Get Client Manager Analysis
-                    with tabs[5]:
-                        st.markdown("## Client Success Strategy")
-                        with st.spinner("Getting Client Success strategy..."):
-                            client_response = get_agent_response(client, "client_manager", project_info)
-                            st.markdown(client_response)
-                            analyses["Client Success Strategy"] = client_response
+                    if new_analysis:
+                        agent_responses = dict(reused)
+                        if st.session_state.stream_responses:
+                            agent_timings = {}
+                            streamed_text = {role: "" for role in AGENT_ROLES}
+                            last_render = {role: 0.0 for role in AGENT_ROLES}
+                            for role, text, done in stream_agent_analyses(client, project_info, timings=agent_timings,
+                                                                            cache_mode=st.session_state.cache_mode,
+                                                                            reuse=reused):
+                                if done:
+                                    agent_responses[role] = text
+                                    agent_placeholders[role].markdown(text)
+                                    continue
+                                streamed_text[role] += text
+                                now = time.perf_counter()
+                                if now - last_render[role] >= STREAM_RENDER_INTERVAL:
+                                    agent_placeholders[role].markdown(streamed_text[role] + " ▌")
+                                    last_render[role] = now
+                            st.session_state.agent_timings = agent_timings
+                        else:
+                            for role, response in run_agent_analyses(client, project_info, cache_mode=st.session_state.cache_mode,
+                                                                     reuse=reused):
+                                agent_placeholders[role].markdown(response)
+                                agent_responses[role] = response
+                        
+                        # Keep analyses in tab order for exports
+                        analyses = {AGENT_DISPLAY[role]['label']: agent_responses[role] for role in AGENT_ROLES}
+                        project_store.save_analyses(project_id, analyses)
                     
+                    profiler.phase("dashboards")
                     # Visual Dashboards Tab
                     with tabs[6]:
                         st.markdown("## 📈 Visual Analytics Dashboard")
                         
                         # Budget Chart
                         st.subheader("💰 Budget Breakdown")
-                        budget_fig = create_budget_chart(budget_range)
+                        budget_fig = figure_cache.get("budget", project_info['budget'])
                         st.plotly_chart(budget_fig, use_container_width=True)
                         
                         # Timeline Chart
                         st.subheader("📅 Project Timeline")
-                        timeline_fig = create_timeline_chart(timeline)
+                        timeline_fig = figure_cache.get("timeline", project_info['timeline'])
                         st.plotly_chart(timeline_fig, use_container_width=True)
                         
                         # Risk Matrix
                         st.subheader("⚠️ Risk Assessment Matrix")
-                        risk_fig = create_risk_matrix()
+                        risk_fig = figure_cache.get("risk")
                         st.plotly_chart(risk_fig, use_container_width=True)
                         
                         # Key Metrics
                         col1, col2, col3, col4 = st.columns(4)
                         with col1:
-                            st.metric("Priority", priority, delta="High Impact" if priority == "High" else "")
+                            st.metric("Priority", project_info['priority'],
+                                      delta="High Impact" if project_info['priority'] == "High" else "")
                         with col2:
-                            st.metric("Timeline", timeline, delta="Aggressive" if "1-2" in timeline else "")
+                            st.metric("Timeline", project_info['timeline'],
+                                      delta="Aggressive" if "1-2" in project_info['timeline'] else "")
                         with col3:
-                            st.metric("Budget", budget_range, delta="Adequate")
+                            st.metric("Budget", project_info['budget'], delta="Adequate")
                         with col4:
                             st.metric("Complexity", "High", delta="Challenging")
                     
+                    profiler.phase("chat")
                     # Chat with Agents Tab
                     with tabs[7]:
                         st.markdown("## 💬 Interactive Chat with Agents")
@@ -1381,12 +3739,20 @@ def main():
                             "Client Success Manager": "client_manager"
                         }
                         
-                        # Chat interface
-                        if agent_choice not in st.session_state.chat_history:
-                            st.session_state.chat_history[agent_choice] = []
+                        # Chat interface, one conversation per analysis and agent
+                        # Only the most recently used conversations are kept in the session
+                        chat_key = (project_id, agent_choice)
+                        memory = remember(st.session_state.chat_history, chat_key,
+                                          st.session_state.chat_history.get(chat_key) or ChatMemory(),
+                                          SESSION_CHAT_LIMIT)
+                        role_analysis = analyses.get(AGENT_DISPLAY[agent_map[agent_choice]]['label'])
                         
                         # Display chat history
-                        for chat in st.session_state.chat_history[agent_choice]:
+                        if memory.dropped:
+                            st.caption(f"💭 {memory.dropped} earlier exchanges are kept as a summary")
+                        if memory.lost:
+                            st.caption(f"⚠️ {memory.lost} earlier exchanges could not be summarized and were left out")
+                        for chat in memory.turns:
                             with st.chat_message("user"):
                                 st.write(chat['question'])
                             with st.chat_message("assistant"):
@@ -1396,72 +3762,76 @@ def main():
                         user_question = st.text_input(f"Ask {agent_choice} a question:", key=f"chat_{agent_choice}")
                         
                         if st.button("Send", key=f"send_{agent_choice}") and user_question:
-                            with st.spinner(f"Getting response from {agent_choice}..."):
-                                chat_context = "\n".join([f"Q: {c['question']}\nA: {c['answer']}" 
-                                                          for c in st.session_state.chat_history[agent_choice]])
-                                
-                                answer = chat_with_agent(
-                                    client, 
-                                    agent_map[agent_choice], 
-                                    project_info, 
-                                    user_question,
-                                    chat_context
-                                )
-                                
-                                st.session_state.chat_history[agent_choice].append({
-                                    'question': user_question,
-                                    'answer': answer
-                                })
-                                st.rerun()
+                            if st.session_state.stream_responses:
+                                with st.chat_message("user"):
+                                    st.write(user_question)
+                                with st.chat_message("assistant"):
+                                    answer = st.write_stream(stream_chat_with_agent(
+                                        client, 
+                                        agent_map[agent_choice], 
+                                        project_info, 
+                                        user_question,
+                                        memory,
+                                        role_analysis
+                                    ))
+                            else:
+                                with st.spinner(f"Getting response from {agent_choice}..."):
+                                    answer = chat_with_agent(
+                                        client, 
+                                        agent_map[agent_choice], 
+                                        project_info, 
+                                        user_question,
+                                        memory,
+                                        role_analysis
+                                    )
+                            
+                            memory.add_turn(user_question, answer)
+                            st.rerun()
                     
                     # Store current analysis
                     st.session_state.current_analysis = analyses
                     
-                    st.success("✅ Complete Analysis Finished!")
-                    st.balloons()
+                    if new_analysis:
+                        st.success("✅ Complete Analysis Finished!")
+                        st.balloons()
                     
+                    # Latency diagnostics
+                    if st.session_state.show_diagnostics and st.session_state.agent_timings:
+                        with st.expander("⏱️ Latency Diagnostics", expanded=False):
+                            timings = st.session_state.agent_timings
+                            st.table({
+                                "Agent": [AGENT_DISPLAY[role]['label'] for role in AGENT_ROLES if role in timings],
+                                "Time to First Token (s)": [f"{timings[role]['ttft']:.2f}" if timings[role]['ttft'] is not None else "N/A"
+                                                            for role in AGENT_ROLES if role in timings],
+                                "Total Time (s)": [f"{timings[role]['total']:.2f}" for role in AGENT_ROLES if role in timings],
+                                "Characters": [timings[role]['chars'] for role in AGENT_ROLES if role in timings]
+                            })
+                    
+                    profiler.phase("exports")
                     # Export Options
                     st.markdown("---")
                     st.subheader("📥 Export Analysis")
                     
-                    col1, col2, col3 = st.columns(3)
-                    
-                    with col1:
-                        # Export to PDF
-                        pdf_data = export_to_pdf(project_info, analyses)
-                        st.download_button(
-                            label="📄 Download PDF Report",
-                            data=pdf_data,
-                            file_name=f"{project_name.replace(' ', '_')}_analysis.pdf",
-                            mime="application/pdf",
-                            use_container_width=True
-                        )
+                    # Files are built on first click and reused from the export cache afterwards
+                    export_cache = get_export_cache()
+                    export_options = [
+                        ("pdf", "📄 Download PDF Report", "pdf", "application/pdf"),
+                        ("md", "📝 Download Markdown", "md", "text/markdown"),
+                        ("json", "📊 Download JSON", "json", "application/json")
+                    ]
                     
-                    with col2:
-                        # Export to Markdown
-                        md_data = export_to_markdown(project_info, analyses)
-                        st.download_button(
-                            label="📝 Download Markdown",
-                            data=md_data,
-                            file_name=f"{project_name.replace(' ', '_')}_analysis.md",
-                            mime="text/markdown",
-                            use_container_width=True
-                        )
-                    
-                    with col3:
-                        # Export to JSON
-                        json_data = json.dumps({
-                            "project_info": project_info,
-                            "analyses": analyses
-                        }, indent=2)
-                        st.download_button(
-                            label="📊 Download JSON",
-                            data=json_data,
-                            file_name=f"{project_name.replace(' ', '_')}_analysis.json",
-                            mime="application/json",
-                            use_container_width=True
-                        )
+                    for col, (kind, label, extension, mime) in zip(st.columns(3), export_options):
+                        with col:
+                            st.download_button(
+                                label=label,
+                                data=lambda kind=kind: export_cache.get(kind, project_info, analyses),
+                                file_name=f"{project_info['name'].replace(' ', '_')}_analysis.{extension}",
+                                mime=mime,
+                                on_click="ignore",
+                                use_container_width=True
+                            )
                 
+                profiler.phase("rating")
                 # ============ NEW FEATURE 3: PROJECT RATING ============
                 st.markdown("---")
                 st.subheader("⭐ Rate This Analysis")
@@ -1472,7 +3842,8 @@ def main():
                         "How helpful was this analysis?",
                         min_value=1,
                         max_value=5,
-                        value=5,
+                        value=saved_rating or 5,
+                        key=f"rating_{project_id}",
                         help="Rate from 1 (Not helpful) to 5 (Very helpful)"
                     )
                     
@@ -1487,37 +3858,68 @@ def main():
                     st.info(f"{rating_emojis[rating]}")
                     
                     # Save rating to project history
-                    if st.session_state.project_history:
-                        st.session_state.project_history[-1]['rating'] = rating
-                        st.session_state.project_history[-1]['success_score'] = success_score_data['total_score']
+                    if rating != saved_rating:
+                        project_store.update_rating(project_id, rating)
                 
                 with col2:
                     st.metric("Your Rating", f"⭐ {rating}/5")
                     st.metric("Success Score", f"{success_score_data['emoji']} {success_score_data['total_score']}/100")
                 
                 # Optional feedback
-                feedback = st.text_area("Additional Feedback (optional)", placeholder="Share your thoughts on how we can improve...")
-                if feedback and st.session_state.project_history:
-                    st.session_state.project_history[-1]['feedback'] = feedback
+                feedback = st.text_area("Additional Feedback (optional)", value=saved_feedback or "",
+                                        key=f"feedback_{project_id}",
+                                        placeholder="Share your thoughts on how we can improve...")
+                if feedback:
+                    if feedback != saved_feedback:
+                        project_store.update_feedback(project_id, feedback)
                     st.success("✅ Thank you for your feedback!")
                 
             except Exception as e:
                 st.error(f"❌ Error during analysis: {str(e)}")
                 st.info("Please check your API key and try again.")
 
+    profiler.phase("sidebar options")
     # Sidebar options
     with st.sidebar:
         st.markdown("---")
         st.subheader("⚙️ Options")
         
+        st.checkbox("⚡ Stream agent responses", key="stream_responses",
+                    help="Show agent answers token by token as they are generated")
+        st.checkbox("⏱️ Show latency diagnostics", key="show_diagnostics",
+                    help="Show time-to-first-token and total time for each agent after an analysis")
+        
+        cache_mode_labels = {"use": "Use cache", "refresh": "Refresh cache", "bypass": "Bypass cache"}
+        st.radio(
+            "🗄️ Response cache",
+            list(cache_mode_labels.keys()),
+            format_func=cache_mode_labels.get,
+            key="cache_mode",
+            horizontal=True,
+            help="Reuse saved agent answers for identical prompts, force fresh answers and re-save them, or skip the cache entirely"
+        )
+        cache_stats = get_response_cache().stats()
+        st.caption(f"Cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses • "
+                   f"{cache_stats['entries']} entries • {cache_stats['bytes'] / 1024:.0f} KB")
+        # The response cache is shared by every user of a server, so only single-user mode may wipe it
+        if not SERVER_MODE and st.button("🧹 Clear Response Cache", use_container_width=True):
+            get_response_cache().clear()
+            st.rerun()
+        
         if st.button("🗑️ Clear All Data", use_container_width=True):
             st.session_state.messages = []
-            st.session_state.project_history = []
+            project_store.clear(owner)
+            st.session_state.last_project_id = None
             st.session_state.chat_history = {}
+            st.session_state.analysis_changes = {}
             st.session_state.current_analysis = {}
             st.success("All data cleared!")
             st.rerun()
         
+        st.markdown("---")
+        st.subheader("📈 LLM Usage (this session)")
+        show_llm_usage()
+        
         st.markdown("---")
         st.markdown("### 💡 Tips")
         st.markdown("""
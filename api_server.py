@@ -0,0 +1,504 @@
+"""REST/JSON API over the analysis engine
+
+An ASGI service (Starlette, served by uvicorn) for other systems to call the
+agency without the Streamlit page. It runs on the same engine as the app: the
+response cache, request scheduler and its rate limits, export cache and LLM
+telemetry are the process-wide ones, and the response cache is shared with the
+app when both point at the same AGENCY_CACHE_PATH.
+
+    GET  /health
+    GET  /templates                industry templates for the project form
+    POST /score                    {"project_info": {...}} or {"projects": [...]}, scored in one vectorized batch
+    POST /analyses                 {"project_info": {...}} or {"projects": [...]}, plus optional "roles",
+                                   "cache_mode" and "stream"; starts analysis jobs (202)
+    GET  /analyses/{id}            job status, finished analyses, errors and success score
+    GET  /analyses/{id}/events     server-sent events: chunk, role_done, then done or failed
+    POST /chat                     {"role", "question", "analysis_id" or "project_info", "conversation_id",
+                                   "stream"}; conversations keep their history on the server
+    POST /exports/{pdf|md|json}    report of an analysis job ("analysis_id") or of "project_info" + "analyses"
+
+Callers send their OpenAI key as "Authorization: Bearer <key>" unless the server
+has a default key (--api-key or $OPENAI_API_KEY). Jobs and conversations are
+only visible to the key that created them.
+
+    python api_server.py --port 8000
+    python api_server.py --mock    # against benchmarks/mock_openai_server.py, without network or API spend
+"""
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import uvicorn
+from starlette.applications import Starlette
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from agency import (
+    AGENT_DISPLAY,
+    AGENT_ERROR_PREFIX,
+    AGENT_ROLES,
+    EXPORT_BUILDERS,
+    PRIORITY_ANALYSIS,
+    PRIORITY_BATCH,
+    ChatMemory,
+    api_key_owner,
+    calculate_success_score,
+    chat_with_agent,
+    get_export_cache,
+    get_industry_templates,
+    get_openai_client,
+    get_scoring_rules,
+    remember,
+    score_projects_batch,
+    stream_agent_analyses,
+    stream_chat_with_agent
+)
+from batch_analyze import REQUIRED_FIELDS
+
+# Analysis jobs run at the same time; each fans out to the agent roles through the shared scheduler
+API_WORKERS = int(os.getenv("AGENCY_API_WORKERS", "4"))
+# Finished jobs and chat conversations kept in memory before the oldest are dropped
+API_JOB_HISTORY = int(os.getenv("AGENCY_API_JOB_HISTORY", "500"))
+API_CONVERSATION_LIMIT = int(os.getenv("AGENCY_API_CONVERSATIONS", "1000"))
+# Projects accepted by one batched /score or /analyses request
+API_BATCH_LIMIT = 100
+CACHE_MODES = ["use", "refresh", "bypass"]
+EXPORT_MEDIA_TYPES = {"pdf": "application/pdf", "md": "text/markdown", "json": "application/json"}
+
+
+class AnalysisJob:
+    """One multi-role analysis: results so far, plus live events for server-sent-event subscribers"""
+
+    def __init__(self, owner, project_info, roles, cache_mode, key):
+        self.id = uuid.uuid4().hex[:12]
+        self.owner = owner
+        self.project_info = project_info
+        self.roles = roles
+        self.cache_mode = cache_mode
+        self.key = key
+        self.status = "queued"
+        self.success_score = calculate_success_score(project_info)
+        self.results = {}
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        # Text streamed so far for roles still running, so late subscribers can catch up
+        self._partial = {}
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed")
+
+    @property
+    def analyses(self):
+        """Finished analyses keyed by agent label, in tab order (the shape the exports take)"""
+        return {AGENT_DISPLAY[role]["label"]: self.results[role] for role in AGENT_ROLES if role in self.results}
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "id": self.id,
+                "status": self.status,
+                "project_info": self.project_info,
+                "roles": self.roles,
+                "cache_mode": self.cache_mode,
+                "success_score": self.success_score,
+                "analyses": self.analyses,
+                "errors": [role for role, text in self.results.items() if text.startswith(AGENT_ERROR_PREFIX)],
+                "error": self.error,
+                "elapsed": round((self.finished_at or time.time()) - self.created_at, 3)
+            }
+
+    def _publish(self, event, data):
+        for loop, events in self._subscribers:
+            loop.call_soon_threadsafe(events.put_nowait, (event, data))
+
+    def add_chunk(self, role, text):
+        with self._lock:
+            self._partial[role] = self._partial.get(role, "") + text
+            self._publish("chunk", {"role": role, "text": text})
+
+    def finish_role(self, role, text):
+        with self._lock:
+            self._partial.pop(role, None)
+            self.results[role] = text
+            self._publish("role_done", {"role": role, "label": AGENT_DISPLAY[role]["label"], "analysis": text})
+
+    def finish(self, error=None):
+        with self._lock:
+            self.status = "failed" if error else "done"
+            self.error = error
+            self.finished_at = time.time()
+            self._publish(self.status, None)
+
+    def subscribe(self, loop):
+        """Queue of (event, data) for this job, starting with a replay of what has happened so far"""
+        events = asyncio.Queue()
+        with self._lock:
+            for role in AGENT_ROLES:
+                if role in self.results:
+                    events.put_nowait(("role_done", {"role": role, "label": AGENT_DISPLAY[role]["label"],
+                                                     "analysis": self.results[role]}))
+                elif self._partial.get(role):
+                    events.put_nowait(("chunk", {"role": role, "text": self._partial[role]}))
+            if self.finished:
+                events.put_nowait((self.status, None))
+            self._subscribers.append((loop, events))
+        return events
+
+    def unsubscribe(self, events):
+        with self._lock:
+            self._subscribers = [(loop, queue) for loop, queue in self._subscribers if queue is not events]
+
+
+class AnalysisJobs:
+    """Runs analysis jobs on a thread pool; identical in-flight requests from one caller share a job"""
+
+    def __init__(self, workers=API_WORKERS, max_jobs=API_JOB_HISTORY):
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analysis-job")
+        self._jobs = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(owner, project_info, roles, cache_mode):
+        fields = {field: value for field, value in project_info.items() if field != "timestamp"}
+        material = json.dumps([owner, fields, roles, cache_mode], sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def submit(self, client, owner, project_info, roles, cache_mode, priority=PRIORITY_ANALYSIS):
+        """Start (or join) the analysis of one project and return its job"""
+        key = self.make_key(owner, project_info, roles, cache_mode)
+        with self._lock:
+            job = self._inflight.get(key)
+            if job is not None:
+                return job
+            job = AnalysisJob(owner, project_info, roles, cache_mode, key)
+            self._jobs[job.id] = job
+            self._inflight[key] = job
+        self._prune()
+        self._executor.submit(self._run, job, client, priority)
+        return job
+
+    def _run(self, job, client, priority):
+        job.status = "running"
+        error = None
+        try:
+            for role, text, done in stream_agent_analyses(client, job.project_info, roles=job.roles,
+                                                          cache_mode=job.cache_mode, priority=priority):
+                if done:
+                    job.finish_role(role, text)
+                else:
+                    job.add_chunk(role, text)
+        except Exception as e:
+            error = str(e)
+        finally:
+            with self._lock:
+                self._inflight.pop(job.key, None)
+            job.finish(error)
+
+    def _prune(self):
+        """Drop the oldest finished jobs beyond max_jobs"""
+        with self._lock:
+            finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+            for job_id in finished[:max(0, len(self._jobs) - self.max_jobs)]:
+                del self._jobs[job_id]
+
+    def get(self, job_id, owner):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or job.owner != owner:
+            raise HTTPException(404, f"No analysis {job_id}")
+        return job
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class Conversations:
+    """Chat memories per caller and conversation id, dropping the least recently used beyond a limit"""
+
+    def __init__(self, limit=API_CONVERSATION_LIMIT):
+        self.limit = limit
+        self._memories = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, owner, conversation_id):
+        with self._lock:
+            key = (owner, conversation_id)
+            return remember(self._memories, key, self._memories.get(key) or ChatMemory(), self.limit)
+
+
+# ============ REQUEST HELPERS ============
+def sse(event, data):
+    """One server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def event_stream(events):
+    """StreamingResponse for an async iterator of server-sent events"""
+    return StreamingResponse(events, media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+async def read_json(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(400, "The request body must be JSON")
+    if not isinstance(body, dict):
+        raise HTTPException(400, "The request body must be a JSON object")
+    return body
+
+
+def caller(request):
+    """(OpenAI client, owner id) for the caller's key, from the Authorization header or the server default"""
+    authorization = request.headers.get("authorization", "")
+    api_key = authorization[7:].strip() if authorization.lower().startswith("bearer ") else request.app.state.api_key
+    if not api_key:
+        raise HTTPException(401, "An OpenAI API key is required (Authorization: Bearer <key>)")
+    return get_openai_client(api_key, request.app.state.base_url), api_key_owner(api_key)
+
+
+def validate_project(project_info):
+    """A copy of project_info with the optional text fields defaulted, like batch_analyze reads its input lines.
+
+    No timestamp is added: the API keeps no history, and a generated one would change exports and their cache key.
+    """
+    if not isinstance(project_info, dict):
+        raise HTTPException(422, "project_info must be an object")
+    missing = [field for field in REQUIRED_FIELDS if not project_info.get(field)]
+    if missing:
+        raise HTTPException(422, f"project_info is missing {', '.join(missing)}")
+    project_info = dict(project_info)
+    project_info.setdefault("technical_requirements", "None specified")
+    project_info.setdefault("special_considerations", "None")
+    return project_info
+
+
+def requested_projects(body):
+    """(projects, batched) from a {"project_info": ...} or {"projects": [...]} body"""
+    if "projects" in body:
+        projects = body["projects"]
+        if not isinstance(projects, list) or not projects:
+            raise HTTPException(422, "projects must be a non-empty list")
+        if len(projects) > API_BATCH_LIMIT:
+            raise HTTPException(413, f"At most {API_BATCH_LIMIT} projects per request")
+        return projects, True
+    return [body.get("project_info")], False
+
+
+# ============ ENDPOINTS ============
+async def health(request):
+    return JSONResponse({"status": "ok"})
+
+
+async def templates(request):
+    return JSONResponse(get_industry_templates())
+
+
+async def score(request):
+    """Success score of one project, or of a batch through the vectorized scorer"""
+    projects, batched = requested_projects(await read_json(request))
+    projects = [validate_project(project_info) for project_info in projects]
+    if not batched:
+        return JSONResponse(await run_in_threadpool(calculate_success_score, projects[0]))
+
+    rules = get_scoring_rules()
+    scores = await run_in_threadpool(score_projects_batch, pd.DataFrame(projects), rules)
+    return JSONResponse({"rules_version": rules.version, "scores": [
+        {"total_score": int(row["total_score"]), "level": str(row["level"]),
+         "categories": {name: int(row[name]) for name in rules.category_names}}
+        for _, row in scores.iterrows()
+    ]})
+
+
+async def create_analyses(request):
+    """Start analysis jobs; with "stream": true the single job's events are streamed back directly"""
+    body = await read_json(request)
+    client, owner = caller(request)
+    projects, batched = requested_projects(body)
+    roles = body.get("roles") or AGENT_ROLES
+    if (not isinstance(roles, list) or not all(isinstance(role, str) for role in roles)
+            or not set(roles) <= set(AGENT_ROLES)):
+        raise HTTPException(422, f"roles must be a list drawn from {', '.join(AGENT_ROLES)}")
+    roles = [role for role in AGENT_ROLES if role in roles]
+    cache_mode = body.get("cache_mode", "use")
+    if cache_mode not in CACHE_MODES:
+        raise HTTPException(422, f"cache_mode must be one of {', '.join(CACHE_MODES)}")
+    projects = [validate_project(project_info) for project_info in projects]
+
+    # Batches yield to interactive and single analyses in the scheduler's queue
+    priority = PRIORITY_BATCH if batched else PRIORITY_ANALYSIS
+    jobs = [request.app.state.jobs.submit(client, owner, project_info, roles, cache_mode, priority)
+            for project_info in projects]
+    if body.get("stream") and not batched:
+        return event_stream(job_events(jobs[0]))
+    if batched:
+        return JSONResponse({"jobs": [job.to_dict() for job in jobs]}, status_code=202)
+    return JSONResponse(jobs[0].to_dict(), status_code=202,
+                        headers={"Location": str(request.url_for("analysis", job_id=jobs[0].id))})
+
+
+async def analysis(request):
+    _, owner = caller(request)
+    return JSONResponse(request.app.state.jobs.get(request.path_params["job_id"], owner).to_dict())
+
+
+async def job_events(job):
+    events = job.subscribe(asyncio.get_running_loop())
+    try:
+        while True:
+            event, data = await events.get()
+            if event in ("done", "failed"):
+                yield sse(event, job.to_dict())
+                return
+            yield sse(event, data)
+    finally:
+        job.unsubscribe(events)
+
+
+async def analysis_events(request):
+    _, owner = caller(request)
+    return event_stream(job_events(request.app.state.jobs.get(request.path_params["job_id"], owner)))
+
+
+async def chat(request):
+    """Ask an agent a follow-up question within a server-side conversation"""
+    body = await read_json(request)
+    client, owner = caller(request)
+    role, question = body.get("role"), body.get("question")
+    if role not in AGENT_ROLES:
+        raise HTTPException(422, f"role must be one of {', '.join(AGENT_ROLES)}")
+    if not question or not isinstance(question, str):
+        raise HTTPException(422, "question is required")
+    if body.get("analysis_id"):
+        job = request.app.state.jobs.get(body["analysis_id"], owner)
+        project_info, analysis_text = job.project_info, job.results.get(role)
+    else:
+        project_info, analysis_text = validate_project(body.get("project_info")), body.get("analysis")
+
+    conversation_id = body.get("conversation_id") or uuid.uuid4().hex[:12]
+    memory = request.app.state.conversations.get(owner, conversation_id)
+
+    if not body.get("stream"):
+        answer = await run_in_threadpool(chat_with_agent, client, role, project_info, question, memory,
+                                         analysis_text)
+        memory.add_turn(question, answer)
+        return JSONResponse({"conversation_id": conversation_id, "role": role, "answer": answer})
+
+    async def answer_events():
+        parts = []
+        async for chunk in iterate_in_threadpool(stream_chat_with_agent(client, role, project_info, question,
+                                                                        memory, analysis_text)):
+            parts.append(chunk)
+            yield sse("chunk", {"text": chunk})
+        memory.add_turn(question, "".join(parts))
+        yield sse("done", {"conversation_id": conversation_id, "role": role, "answer": "".join(parts)})
+
+    return event_stream(answer_events())
+
+
+async def export(request):
+    """PDF, Markdown or JSON report, built once per distinct input by the shared export cache"""
+    kind = request.path_params["kind"]
+    if kind not in EXPORT_BUILDERS:
+        raise HTTPException(404, f"Export kind must be one of {', '.join(EXPORT_BUILDERS)}")
+    body = await read_json(request)
+    if body.get("analysis_id"):
+        _, owner = caller(request)
+        job = request.app.state.jobs.get(body["analysis_id"], owner)
+        if not job.finished:
+            raise HTTPException(409, f"Analysis {job.id} is still {job.status}")
+        project_info, analyses = job.project_info, job.analyses
+    else:
+        project_info, analyses = validate_project(body.get("project_info")), body.get("analyses")
+        if not isinstance(analyses, dict) or not all(isinstance(text, str) for text in analyses.values()):
+            raise HTTPException(422, "analyses must map agent labels to analysis text")
+
+    data = await run_in_threadpool(get_export_cache().get, kind, project_info, analyses)
+    filename = f"{re.sub(r'[^A-Za-z0-9]+', '_', project_info['name']).strip('_') or 'project'}_analysis.{kind}"
+    return Response(data, media_type=EXPORT_MEDIA_TYPES[kind],
+                    headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
+async def http_error(request, exc):
+    return JSONResponse({"error": exc.detail}, status_code=exc.status_code)
+
+
+def create_app(api_key=None, base_url=None, workers=API_WORKERS):
+    """The ASGI application; api_key is the default for callers without an Authorization header"""
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        yield
+        app.state.jobs.shutdown()
+
+    app = Starlette(
+        routes=[
+            Route("/health", health),
+            Route("/templates", templates),
+            Route("/score", score, methods=["POST"]),
+            Route("/analyses", create_analyses, methods=["POST"]),
+            Route("/analyses/{job_id}", analysis, name="analysis"),
+            Route("/analyses/{job_id}/events", analysis_events),
+            Route("/chat", chat, methods=["POST"]),
+            Route("/exports/{kind}", export, methods=["POST"])
+        ],
+        exception_handlers={HTTPException: http_error},
+        lifespan=lifespan
+    )
+    app.state.api_key = api_key
+    app.state.base_url = base_url
+    app.state.jobs = AnalysisJobs(workers)
+    app.state.conversations = Conversations()
+    return app
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the AI Services Agency as a REST/JSON API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=API_WORKERS, help="Analysis jobs run at the same time")
+    parser.add_argument("--api-key", default=os.getenv("OPENAI_API_KEY"),
+                        help="Key for callers without an Authorization header (defaults to $OPENAI_API_KEY)")
+    parser.add_argument("--base-url", default=os.getenv("OPENAI_BASE_URL"),
+                        help="OpenAI-compatible endpoint, e.g. a local mock server")
+    parser.add_argument("--mock", action="store_true",
+                        help="Start benchmarks/mock_openai_server.py in-process and use it as the endpoint")
+    parser.add_argument("--mock-latency", type=float, default=0.5)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Streamlit sets a level on each of its loggers, and warns about bare mode on every engine call
+    for name in [name for name in logging.root.manager.loggerDict if name.startswith("streamlit")]:
+        logging.getLogger(name).setLevel(logging.ERROR)
+    if args.mock:
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+        from mock_openai_server import start_mock_server
+        args.base_url = start_mock_server(latency=args.mock_latency).base_url
+        args.api_key = args.api_key or "mock-key"
+        print(f"Mock OpenAI endpoint at {args.base_url}")
+    uvicorn.run(create_app(args.api_key, args.base_url, args.workers), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
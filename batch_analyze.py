@@ -0,0 +1,246 @@
+"""Headless batch analysis over a JSONL file of projects
+
+Each input line is a project_info dict with the same fields main() builds
+(name, description, type, budget, timeline, priority and optionally
+technical_requirements / special_considerations). For every project the
+success score and all five agent analyses are computed and streamed to the
+outputs as soon as the project completes.
+
+    python batch_analyze.py projects.jsonl --output results.jsonl --markdown-dir reports/md --pdf-dir reports/pdf
+
+Re-running the same command resumes after a crash: projects whose id is
+already in the output JSONL are skipped.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from agency import (
+    AGENT_DISPLAY,
+    AGENT_ERROR_PREFIX,
+    AGENT_ROLES,
+    PRIORITY_BATCH,
+    REPORT_CHARTS,
+    calculate_success_score,
+    export_to_markdown,
+    get_openai_client,
+    render_report_chart,
+    report_chart_images,
+    run_agent_analyses,
+    write_pdf_report
+)
+
+REQUIRED_FIELDS = ["name", "description", "type", "budget", "timeline", "priority"]
+
+
+class ThroughputMeter:
+    """Thread-safe counters for projects completed and tokens used"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.projects = 0
+        self.failed = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._lock = threading.Lock()
+
+    def record_usage(self, role, usage):
+        with self._lock:
+            self.prompt_tokens += usage.prompt_tokens or 0
+            self.completion_tokens += usage.completion_tokens or 0
+
+    def record_project(self, ok):
+        with self._lock:
+            if ok:
+                self.projects += 1
+            else:
+                self.failed += 1
+
+    def summary(self):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        total_tokens = self.prompt_tokens + self.completion_tokens
+        return (f"{self.projects} done, {self.failed} failed in {elapsed:.1f}s | "
+                f"{self.projects / elapsed * 60:.2f} projects/min | "
+                f"{total_tokens / elapsed:.0f} tokens/sec ({self.completion_tokens / elapsed:.0f} completion)")
+
+
+def project_id(project_info):
+    """Stable id for a project: its explicit "id" or a hash of the analyzed fields"""
+    if project_info.get("id"):
+        return str(project_info["id"])
+    material = json.dumps({field: project_info.get(field) for field in REQUIRED_FIELDS}, sort_keys=True)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()[:16]
+
+
+def load_projects(path):
+    projects = []
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            project_info = json.loads(line)
+            missing = [field for field in REQUIRED_FIELDS if not project_info.get(field)]
+            if missing:
+                print(f"Skipping line {line_no}: missing {', '.join(missing)}", file=sys.stderr)
+                continue
+            project_info.setdefault("technical_requirements", "None specified")
+            project_info.setdefault("special_considerations", "None")
+            projects.append(project_info)
+    return projects
+
+
+def load_completed_ids(path):
+    """Ids already present in the output, ignoring a truncated last line from a crash"""
+    completed = set()
+    if not os.path.exists(path):
+        return completed
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                completed.add(json.loads(line)["id"])
+            except (ValueError, KeyError):
+                continue
+    return completed
+
+
+def safe_filename(pid, name):
+    return f"{pid}_{re.sub(r'[^A-Za-z0-9]+', '_', name).strip('_')[:60]}"
+
+
+def analyze_project(client, project_info, args, meter):
+    """Score and analyze one project, returning its output record"""
+    start = time.perf_counter()
+    project_info = dict(project_info)
+    project_info.setdefault("timestamp", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+
+    responses = dict(run_agent_analyses(
+        client,
+        project_info,
+        max_workers=args.role_concurrency,
+        cache_mode=args.cache_mode,
+        on_usage=meter.record_usage,
+        priority=PRIORITY_BATCH
+    ))
+    errors = [role for role in AGENT_ROLES if responses[role].startswith(AGENT_ERROR_PREFIX)]
+
+    success_score = calculate_success_score(project_info)
+    return {
+        "id": project_id(project_info),
+        "project_info": project_info,
+        "success_score": success_score,
+        "score_version": success_score["rules_version"],
+        "analyses": {AGENT_DISPLAY[role]["label"]: responses[role] for role in AGENT_ROLES},
+        "errors": errors,
+        "elapsed": round(time.perf_counter() - start, 3),
+        "completed_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+
+def write_markdown_charts(directory, filename, project_info):
+    """Write the report charts as PNGs beside a Markdown report and return (title, relative path) links"""
+    links = []
+    for kind, title in REPORT_CHARTS:
+        image = render_report_chart(kind, project_info, image_format="png")
+        if image:
+            with open(os.path.join(directory, f"{filename}_{kind}.png"), "wb") as f:
+                f.write(image)
+            links.append((title, f"{filename}_{kind}.png"))
+    return links
+
+
+def write_reports(record, args):
+    """Write the optional Markdown and PDF reports for a completed project"""
+    filename = safe_filename(record["id"], record["project_info"]["name"])
+    if args.markdown_dir:
+        chart_links = None
+        if args.markdown_charts:
+            chart_links = write_markdown_charts(args.markdown_dir, filename, record["project_info"])
+        with open(os.path.join(args.markdown_dir, filename + ".md"), "w", encoding="utf-8") as f:
+            f.write(export_to_markdown(record["project_info"], record["analyses"], chart_links))
+    if args.pdf_dir:
+        write_pdf_report(os.path.join(args.pdf_dir, filename + ".pdf"), record["project_info"], record["analyses"],
+                         report_chart_images(record["project_info"]))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the AI Services Agency over a JSONL file of projects")
+    parser.add_argument("input", help="JSONL file with one project_info object per line")
+    parser.add_argument("--output", required=True, help="JSONL file results are appended to (also used for resume)")
+    parser.add_argument("--markdown-dir", help="Directory for per-project Markdown reports")
+    parser.add_argument("--markdown-charts", action="store_true",
+                        help="Write the charts as PNGs next to each Markdown report and link them")
+    parser.add_argument("--pdf-dir", help="Directory for per-project PDF reports")
+    parser.add_argument("--concurrency", type=int, default=4, help="Projects analyzed at the same time")
+    parser.add_argument("--role-concurrency", type=int, default=len(AGENT_ROLES),
+                        help="Agent requests in flight per project")
+    parser.add_argument("--cache-mode", choices=["use", "refresh", "bypass"], default="use")
+    parser.add_argument("--api-key", default=os.getenv("OPENAI_API_KEY"), help="Defaults to $OPENAI_API_KEY")
+    parser.add_argument("--base-url", default=os.getenv("OPENAI_BASE_URL"),
+                        help="OpenAI-compatible endpoint, e.g. a local mock server")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    if not args.api_key:
+        sys.exit("An OpenAI API key is required (--api-key or OPENAI_API_KEY)")
+
+    for directory in (args.markdown_dir, args.pdf_dir):
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    projects = load_projects(args.input)
+    completed = load_completed_ids(args.output)
+    pending = [p for p in projects if project_id(p) not in completed]
+    print(f"{len(projects)} projects, {len(projects) - len(pending)} already done, {len(pending)} to analyze")
+    if not pending:
+        return
+
+    client = get_openai_client(args.api_key, args.base_url)
+    meter = ThroughputMeter()
+
+    with open(args.output, "a", encoding="utf-8") as output, \
+            ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as pool:
+        futures = {pool.submit(analyze_project, client, p, args, meter): p for p in pending}
+        for done, future in enumerate(as_completed(futures), start=1):
+            name = futures[future]["name"]
+            try:
+                record = future.result()
+            except Exception as e:
+                meter.record_project(False)
+                print(f"[{done}/{len(pending)}] {name}: failed ({e})", file=sys.stderr)
+                continue
+
+            if record["errors"]:
+                # Leave it out of the output so the next run retries it
+                meter.record_project(False)
+                print(f"[{done}/{len(pending)}] {name}: agent errors in {', '.join(record['errors'])}", file=sys.stderr)
+                continue
+
+            try:
+                write_reports(record, args)
+            except Exception as e:
+                # Left out of the output like agent errors; the retry gets its answers from the response cache
+                meter.record_project(False)
+                print(f"[{done}/{len(pending)}] {name}: report failed ({e})", file=sys.stderr)
+                continue
+
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+            meter.record_project(True)
+            print(f"[{done}/{len(pending)}] {name} ({record['elapsed']:.1f}s) | {meter.summary()}")
+
+    print(f"Finished: {meter.summary()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Benchmark: sidebar analytics over a large project history
+
+Compares the old per-rerun recomputation (sums over the whole history plus
+max(set(types), key=types.count) for the top category) with reading a
+snapshot from the incremental AnalyticsAggregator.
+
+    python benchmarks/bench_analytics.py --projects 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agency import PROJECT_TYPE_OPTIONS, AnalyticsAggregator
+
+
+def build_history(count, seed=42):
+    rng = random.Random(seed)
+    return [{
+        'type': rng.choice(PROJECT_TYPE_OPTIONS),
+        'success_score': rng.randint(40, 100),
+        'rating': rng.randint(1, 5)
+    } for _ in range(count)]
+
+
+def scan_stats(history):
+    """The sidebar computation main() used to run on every rerun"""
+    total_projects = len(history)
+    avg_score = sum([p.get('success_score', 0) for p in history]) / total_projects if total_projects > 0 else 0
+    total_ratings = sum([p.get('rating', 0) for p in history])
+    avg_rating = total_ratings / total_projects if total_projects > 0 else 0
+    project_types = [p.get('type', 'Unknown') for p in history]
+    most_common = max(set(project_types), key=project_types.count)
+    return total_projects, avg_score, avg_rating, most_common
+
+
+def best_of(repeat, fn):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark incremental sidebar analytics")
+    parser.add_argument("--projects", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    history = build_history(args.projects)
+
+    aggregator = AnalyticsAggregator()
+    start = time.perf_counter()
+    for project in history:
+        aggregator.add_project(project['type'], project['success_score'], project['rating'])
+    build_seconds = time.perf_counter() - start
+
+    expected = scan_stats(history)
+    snapshot = aggregator.snapshot()
+    assert snapshot['total_projects'] == expected[0]
+    assert abs(snapshot['avg_score'] - expected[1]) < 1e-9
+    assert abs(snapshot['avg_rating'] - expected[2]) < 1e-9
+
+    scan_seconds = best_of(args.repeat, lambda: scan_stats(history))
+    snapshot_seconds = best_of(args.repeat, aggregator.snapshot)
+    update_seconds = best_of(args.repeat, lambda: aggregator.update_rating(3, 4))
+
+    print(f"History size:                {args.projects:,} projects")
+    print(f"Full scan per rerun:         {scan_seconds * 1000:10.3f} ms")
+    print(f"Aggregator snapshot:         {snapshot_seconds * 1000:10.3f} ms")
+    print(f"Aggregator rating update:    {update_seconds * 1000:10.3f} ms")
+    print(f"Aggregator add (amortized):  {build_seconds / args.projects * 1e6:10.3f} us/project")
+    print(f"Speed-up per rerun:          x{scan_seconds / snapshot_seconds:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Benchmark: sequential vs concurrent agent analyses
+
+Times the five agent roles against the local mock server, first one after
+another (the old behaviour of main()) and then through run_agent_analyses
+with different concurrency caps. Every call bypasses the response cache, so
+each timing pays the mock latency; history and telemetry go to a throwaway
+directory.
+
+    python benchmarks/bench_fanout.py --latency 2.0
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Must be set before agency is imported, which reads them into constants
+BENCH_DATA_DIR = tempfile.mkdtemp(prefix="agency-bench-")
+os.environ["AGENCY_DATA_DIR"] = BENCH_DATA_DIR
+os.environ["AGENCY_CACHE_PATH"] = os.path.join(BENCH_DATA_DIR, "responses.sqlite3")
+os.environ["AGENCY_PROJECTS_DB"] = os.path.join(BENCH_DATA_DIR, "projects.sqlite3")
+os.environ["AGENCY_TELEMETRY_DB"] = os.path.join(BENCH_DATA_DIR, "telemetry.sqlite3")
+
+from openai import OpenAI
+
+from agency import AGENT_ROLES, get_agent_response, get_industry_templates, run_agent_analyses
+from mock_openai_server import start_mock_server
+
+
+def build_project_info():
+    template = get_industry_templates()["SaaS Platform"]
+    return {
+        "name": "SaaS Platform",
+        "description": template["description"],
+        "type": template["type"],
+        "timeline": template["timeline"],
+        "budget": template["budget"],
+        "priority": template["priority"]
+    }
+
+
+def time_sequential(client, project_info):
+    start = time.perf_counter()
+    for role in AGENT_ROLES:
+        get_agent_response(client, role, project_info, cache_mode="bypass")
+    return time.perf_counter() - start
+
+
+def time_concurrent(client, project_info, max_workers):
+    start = time.perf_counter()
+    for _ in run_agent_analyses(client, project_info, max_workers=max_workers, cache_mode="bypass"):
+        pass
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent agent fan-out")
+    parser.add_argument("--latency", type=float, default=1.0, help="Injected seconds per mock call")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    server = start_mock_server(latency=args.latency)
+    client = OpenAI(api_key="mock-key", base_url=server.base_url)
+    project_info = build_project_info()
+
+    print(f"Mock latency per call: {args.latency:.2f}s, {len(AGENT_ROLES)} roles, best of {args.repeat}")
+    results = [("sequential", min(time_sequential(client, project_info) for _ in range(args.repeat)))]
+    for cap in range(1, len(AGENT_ROLES) + 1):
+        best = min(time_concurrent(client, project_info, cap) for _ in range(args.repeat))
+        results.append((f"concurrent (cap={cap})", best))
+
+    baseline = results[0][1]
+    for name, seconds in results:
+        print(f"{name:<24} {seconds:7.2f}s  x{baseline / seconds:4.1f}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Benchmark: dashboard figure construction per rerun
+
+Times the figure work behind the Visual Dashboards and Success Score tabs
+(radar, budget, timeline and risk charts) when every rerun rebuilds the
+figures, against lookups in a warmed FigureCache. Also times warming the
+cache from scratch and from its JSON files on disk.
+
+    python benchmarks/bench_figures.py --reruns 50
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agency import (
+    BUDGET_OPTIONS,
+    FIGURE_BUILDERS,
+    TIMELINE_OPTIONS,
+    FigureCache,
+    calculate_success_score,
+    get_industry_templates
+)
+
+
+def build_reruns(count, seed=42):
+    """(score_data, budget, timeline) inputs for a sequence of dashboard reruns"""
+    rng = random.Random(seed)
+    templates = list(get_industry_templates().values())
+    reruns = []
+    for _ in range(count):
+        template = rng.choice(templates)
+        project_info = {
+            "description": template["description"],
+            "type": template["type"],
+            "priority": rng.choice(["High", "Medium", "Low"]),
+            "budget": rng.choice(BUDGET_OPTIONS),
+            "timeline": rng.choice(TIMELINE_OPTIONS)
+        }
+        reruns.append((calculate_success_score(project_info), project_info["budget"], project_info["timeline"]))
+    return reruns
+
+
+def rerun_uncached(score_data, budget, timeline):
+    return [
+        FIGURE_BUILDERS["success_score"](score_data),
+        FIGURE_BUILDERS["budget"](budget),
+        FIGURE_BUILDERS["timeline"](timeline),
+        FIGURE_BUILDERS["risk"]()
+    ]
+
+
+def rerun_cached(cache, score_data, budget, timeline):
+    return [
+        cache.get("success_score", score_data),
+        cache.get("budget", budget),
+        cache.get("timeline", timeline),
+        cache.get("risk")
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard figure cache")
+    parser.add_argument("--reruns", type=int, default=50)
+    args = parser.parse_args()
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+    reruns = build_reruns(args.reruns)
+
+    start = time.perf_counter()
+    for inputs in reruns:
+        rerun_uncached(*inputs)
+    uncached = (time.perf_counter() - start) / len(reruns)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        start = time.perf_counter()
+        FigureCache(cache_dir=cache_dir).warm()
+        warm_build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        FigureCache(cache_dir=cache_dir).warm()
+        warm_disk = time.perf_counter() - start
+
+    cache = FigureCache().warm()
+    for inputs in reruns:
+        rerun_cached(cache, *inputs)
+    start = time.perf_counter()
+    for inputs in reruns:
+        rerun_cached(cache, *inputs)
+    cached = (time.perf_counter() - start) / len(reruns)
+
+    print(f"Reruns:                        {len(reruns)} (4 figures each)")
+    print(f"Rebuild figures per rerun:     {uncached * 1000:10.3f} ms")
+    print(f"Figure cache per rerun:        {cached * 1000:10.3f} ms")
+    print(f"Warm cache by building:        {warm_build * 1000:10.1f} ms")
+    print(f"Warm cache from disk JSON:     {warm_disk * 1000:10.1f} ms")
+    print(f"Speed-up per rerun:            x{uncached / cached:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
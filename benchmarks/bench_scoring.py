@@ -0,0 +1,88 @@
+"""Benchmark: scalar vs vectorized success scoring
+
+Scores a synthetic history with calculate_success_score one dict at a time
+and with score_projects_batch over columns, and checks that both agree on
+every category, total and level.
+
+    python benchmarks/bench_scoring.py --projects 1000000
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agency import (
+    BUDGET_OPTIONS,
+    PROJECT_TYPE_OPTIONS,
+    TIMELINE_OPTIONS,
+    calculate_success_score,
+    get_scoring_rules,
+    score_projects_batch
+)
+
+
+def build_projects(count, seed=42):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "budget": rng.choice(BUDGET_OPTIONS, count),
+        "timeline": rng.choice(TIMELINE_OPTIONS, count),
+        "priority": rng.choice(["High", "Medium", "Low"], count),
+        "type": rng.choice(PROJECT_TYPE_OPTIONS, count),
+        "description_words": rng.integers(0, 80, count)
+    })
+
+
+def score_scalar(projects):
+    """The per-dict loop re-scoring used to need"""
+    rules = get_scoring_rules()
+    results = []
+    for budget, timeline, priority, proj_type, words in zip(projects["budget"], projects["timeline"],
+                                                            projects["priority"], projects["type"],
+                                                            projects["description_words"]):
+        results.append(calculate_success_score({
+            "budget": budget,
+            "timeline": timeline,
+            "priority": priority,
+            "type": proj_type,
+            "description": " ".join(["word"] * int(words))
+        }, rules))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vectorized success scoring")
+    parser.add_argument("--projects", type=int, default=1000000)
+    args = parser.parse_args()
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+    projects = build_projects(args.projects)
+
+    start = time.perf_counter()
+    batch = score_projects_batch(projects)
+    batch_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scalar = score_scalar(projects)
+    scalar_seconds = time.perf_counter() - start
+
+    for category in get_scoring_rules().category_names:
+        expected = np.array([result["breakdown"][category]["score"] for result in scalar])
+        assert np.array_equal(batch[category].to_numpy(), expected), category
+    assert np.array_equal(batch["total_score"].to_numpy(), np.array([result["total_score"] for result in scalar]))
+    assert list(batch["level"].astype(str)) == [result["level"] for result in scalar]
+
+    print(f"Projects:            {args.projects:,}")
+    print(f"Scalar loop:         {scalar_seconds:8.2f} s  ({args.projects / scalar_seconds:,.0f} projects/s)")
+    print(f"Vectorized batch:    {batch_seconds:8.3f} s  ({args.projects / batch_seconds:,.0f} projects/s)")
+    print(f"Speed-up:            x{scalar_seconds / batch_seconds:,.0f}")
+    print("Results match the scalar function for every category, total and level")
+
+
+if __name__ == "__main__":
+    main()
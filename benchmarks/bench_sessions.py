@@ -0,0 +1,264 @@
+"""Load test: concurrent user sessions against one server-mode app process
+
+Starts the local mock OpenAI server and `streamlit run agency.py` with
+AGENCY_SERVER_MODE=1, then connects N simulated users at once over the same
+websocket protocol the browser uses. All sessions live in that one server
+process, sharing its response cache, suggestion cache, chart caches, client
+pool and scheduler. Every user loads the app, enters an API key, runs an
+analysis, sends a few chat questions and triggers a plain rerun.
+
+Reports per-step latency (p50 / p95 / max), the server's resident memory
+idle, with every session finished and per session, LLM requests and
+response-cache hits, and checks that every user sees only their own history.
+
+    python benchmarks/bench_sessions.py --sessions 50 --latency 0.5 --token-rate 200
+
+Users are told apart by API key, or with --user-header by a header an auth
+proxy would set (all users then share one key). Projects cycle through
+--distinct-projects templates, so later sessions get cached agent answers that
+earlier ones paid for.
+"""
+import argparse
+import logging
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from websockets.sync.client import connect
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from agency import LLMTelemetry, get_industry_templates
+from mock_openai_server import start_mock_server
+
+STEPS = ["load", "api key", "analyze", "chat", "rerun"]
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def process_rss(pid):
+    """Resident memory of a process in bytes (Linux /proc)"""
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def start_app(port, env):
+    """`streamlit run agency.py` in server mode, returned once its health check answers"""
+    app = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", os.path.join(APP_DIR, "agency.py"),
+         "--server.headless=true", f"--server.port={port}", "--browser.gatherUsageStats=false",
+         "--server.fileWatcherType=none"],
+        cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    for _ in range(300):
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1)
+            return app
+        except OSError:
+            time.sleep(0.1)
+    app.terminate()
+    raise RuntimeError("The app did not start")
+
+
+def open_session(port, headers=None):
+    """Websocket connection to the app, as a browser tab opens it"""
+    return connect(f"ws://127.0.0.1:{port}/_stcore/stream", subprotocols=["streamlit"],
+                   additional_headers=headers, max_size=None, open_timeout=60)
+
+
+class SimulatedUser:
+    """One browser session driven over the Streamlit websocket protocol"""
+
+    def __init__(self, ws, timeout=600):
+        self.ws = ws
+        self.timeout = timeout
+        self.widget_values = {}
+        self.elements = []
+
+    def rerun(self, *triggers):
+        """Send the widget values (plus one-shot button triggers) and wait for the script run to finish"""
+        message = BackMsg()
+        message.rerun_script.widget_states.widgets.extend(list(self.widget_values.values()) + list(triggers))
+        self.ws.send(message.SerializeToString())
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(self.ws.recv(timeout=self.timeout))
+            kind = forward.WhichOneof("type")
+            if kind == "new_session":
+                self.elements = []
+            elif kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                element = forward.delta.new_element
+                self.elements.append((element.WhichOneof("type"), getattr(element, element.WhichOneof("type"))))
+            elif kind == "script_finished" and forward.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                return self
+
+    def widget_id(self, kind, match):
+        """Id of the first widget of a type whose label or id contains `match`"""
+        for element_kind, element in self.elements:
+            if element_kind == kind and (match in element.label or match in element.id):
+                return element.id
+        raise LookupError(f"No {kind} matching {match!r}")
+
+    def set_text(self, kind, match, value):
+        state = WidgetState(id=self.widget_id(kind, match), string_value=value)
+        self.widget_values[state.id] = state
+        return self
+
+    def set_checkbox(self, match, value):
+        state = WidgetState(id=self.widget_id("checkbox", match), bool_value=value)
+        self.widget_values[state.id] = state
+        return self
+
+    def click(self, match):
+        return self.rerun(WidgetState(id=self.widget_id("button", match), trigger_value=True))
+
+    def texts(self, kind="markdown"):
+        return [element.body for element_kind, element in self.elements if element_kind == kind]
+
+    def exceptions(self):
+        return [element.message for element_kind, element in self.elements if element_kind == "exception"]
+
+
+def run_session(index, port, template, args, timings, started, finished):
+    """One simulated user; returns what the user saw"""
+
+    def step(name, action):
+        start = time.perf_counter()
+        action()
+        timings[name].append(time.perf_counter() - start)
+
+    headers = {args.user_header: f"user-{index}"} if args.user_header else None
+    api_key = "sk-load-test" if args.user_header else f"sk-load-test-{index}"
+    started.wait()
+    with open_session(port, headers) as ws:
+        user = SimulatedUser(ws)
+        step("load", user.rerun)
+        step("api key", lambda: user.set_text("text_input", "OpenAI API Key", api_key).rerun())
+
+        user.set_text("text_input", "Project Name", template["name"])
+        user.set_text("text_area", "Project Description", template["description"])
+        step("analyze", lambda: user.click("Analyze Project"))
+
+        for turn in range(args.chat_turns):
+            user.set_text("text_input", "chat_CEO", f"User {index} question {turn}: what is the biggest risk?")
+            step("chat", lambda: user.click("send_CEO"))
+
+        step("rerun", lambda: user.set_checkbox("latency diagnostics", True).rerun())
+        seen = {
+            "errors": user.exceptions(),
+            "history": next((text for text in user.texts() if "projects analyzed" in text), None)
+        }
+        # Keep the session open until every user is done, so memory is measured with all of them live
+        finished.wait()
+        return seen
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test concurrent server-mode sessions")
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.5, help="mock server seconds before the first token")
+    parser.add_argument("--token-rate", type=float, default=200.0, help="mock streamed tokens per second")
+    parser.add_argument("--chat-turns", type=int, default=3, help="chat questions per session")
+    parser.add_argument("--distinct-projects", type=int, default=5)
+    parser.add_argument("--user-header", help="identify users by this request header instead of by API key")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    data_dir = tempfile.mkdtemp(prefix="agency-sessions-")
+    mock = start_mock_server(latency=args.latency, token_delay=1.0 / args.token_rate if args.token_rate else 0.0)
+    env = dict(
+        os.environ,
+        AGENCY_SERVER_MODE="1",
+        AGENCY_DATA_DIR=data_dir,
+        AGENCY_CACHE_PATH=os.path.join(data_dir, "responses.sqlite3"),
+        OPENAI_BASE_URL=mock.base_url
+    )
+    if args.user_header:
+        env["AGENCY_USER_HEADER"] = args.user_header
+    port = free_port()
+    app = start_app(port, env)
+    template_names = list(get_industry_templates())[:args.distinct_projects]
+    templates = [dict(get_industry_templates()[name], name=name) for name in template_names]
+
+    try:
+        # One warm-up session so the idle figure includes imports and process-wide caches
+        with open_session(port) as ws:
+            SimulatedUser(ws).rerun()
+        rss_idle = process_rss(app.pid)
+
+        timings = defaultdict(list)
+        started = threading.Barrier(args.sessions)
+        finished = threading.Barrier(args.sessions + 1)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+            futures = [pool.submit(run_session, index, port, templates[index % len(templates)], args,
+                                   timings, started, finished)
+                       for index in range(args.sessions)]
+            # Sessions finish with the plain rerun; a future done early means a session failed
+            while len(timings["rerun"]) < args.sessions and not any(future.done() for future in futures):
+                time.sleep(0.1)
+            wall = time.perf_counter() - start
+            rss_live = process_rss(app.pid)
+            if any(future.done() for future in futures):
+                finished.abort()
+                # Surface the session's own error rather than the broken barrier it left the others with
+                failed = sorted(futures, key=lambda future: isinstance(future.exception(), threading.BrokenBarrierError))
+                failed[0].result()
+            finished.wait()
+            sessions = [future.result() for future in futures]
+    finally:
+        app.terminate()
+        app.wait()
+        mock.shutdown()
+
+    errors = [error for session in sessions for error in session["errors"]]
+    assert not errors, errors[:3]
+    # Isolation: one owner per user, each owning exactly the one project they analyzed
+    with sqlite3.connect(os.path.join(data_dir, "projects.sqlite3")) as conn:
+        owned = conn.execute("SELECT owner, COUNT(*) FROM projects GROUP BY owner").fetchall()
+    assert len(owned) == args.sessions and all(count == 1 for _, count in owned), owned
+    assert all(session["history"] and "**1 projects analyzed**" in session["history"] for session in sessions), \
+        [session["history"] for session in sessions]
+    usage = LLMTelemetry(os.path.join(data_dir, "telemetry.sqlite3")).summary()
+
+    print(f"Sessions:                {args.sessions} concurrent ({len(templates)} distinct projects, "
+          f"{args.chat_turns} chat turns each, users by {args.user_header or 'API key'})")
+    print(f"Wall time:               {wall:8.1f} s")
+    print(f"{'Step':<24} {'p50':>8} {'p95':>8} {'max':>8}")
+    for name in STEPS:
+        values = timings[name]
+        if values:
+            print(f"  {name:<22} {percentile(values, 0.5):7.2f}s {percentile(values, 0.95):7.2f}s "
+                  f"{max(values):7.2f}s")
+    print(f"Server RSS idle / live:  {rss_idle / 2**20:8.1f} MB / {rss_live / 2**20:.1f} MB")
+    print(f"RSS per session:         {(rss_live - rss_idle) / args.sessions / 2**20:8.2f} MB")
+    print(f"LLM requests:            {mock.request_count:8d} ({usage['cache_hits']} response-cache hits)")
+    print(f"Isolation:               each of {args.sessions} users sees only their own project")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""Benchmark suite: end-to-end latency, TTFT, throughput, suggestion calls and exports
+
+Starts the local mock OpenAI server with the given latency, token rate and
+error rate, then measures against it:
+
+  e2e          wall time of a full five-agent analysis (blocking calls)
+  ttft         time-to-first-token per agent when streaming
+  throughput   analyses/min and latency under N concurrent sessions
+  suggestions  AI wizard calls made per script rerun, driven through AppTest
+  exports      PDF / Markdown / JSON and portfolio export time and memory peak
+
+Results are written as JSON; pass --baseline with an earlier results file to
+print the change of every metric against it.
+
+    python benchmarks/bench_suite.py --latency 0.5 --token-rate 200 --error-rate 0.02 \\
+        --sessions 1 5 10 --output bench_results.json --baseline baseline.json
+
+The response cache, telemetry and project history go to a throwaway directory,
+so runs never read or pollute the app's own data.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+# Must be set before agency is imported, which reads them into constants
+BENCH_DATA_DIR = tempfile.mkdtemp(prefix="agency-bench-")
+os.environ["AGENCY_DATA_DIR"] = BENCH_DATA_DIR
+os.environ["AGENCY_CACHE_PATH"] = os.path.join(BENCH_DATA_DIR, "responses.sqlite3")
+os.environ["AGENCY_PROJECTS_DB"] = os.path.join(BENCH_DATA_DIR, "projects.sqlite3")
+os.environ["AGENCY_TELEMETRY_DB"] = os.path.join(BENCH_DATA_DIR, "telemetry.sqlite3")
+
+from agency import (
+    AGENT_DISPLAY,
+    AGENT_ROLES,
+    export_to_json,
+    export_to_markdown,
+    export_to_pdf,
+    get_industry_templates,
+    get_llm_telemetry,
+    get_openai_client,
+    run_agent_analyses,
+    stream_agent_analyses,
+    write_portfolio_report
+)
+from mock_openai_server import MOCK_ANSWER, start_mock_server
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def summarize(values):
+    """p50 / p95 / max of a list of seconds, rounded for the JSON report"""
+    return {
+        "p50": round(percentile(values, 0.5), 4),
+        "p95": round(percentile(values, 0.95), 4),
+        "max": round(max(values), 4),
+        "samples": len(values)
+    }
+
+
+def build_project_info(template_name="SaaS Platform"):
+    template = get_industry_templates()[template_name]
+    return {
+        "name": template_name,
+        "description": template["description"],
+        "type": template["type"],
+        "timeline": template["timeline"],
+        "budget": template["budget"],
+        "priority": template["priority"],
+        "technical_requirements": template["tech"],
+        "special_considerations": "None",
+        "timestamp": "2025-01-01 00:00:00"
+    }
+
+
+def bench_e2e(client, project_info, repeat):
+    """Wall time of full analyses with blocking calls, cache bypassed"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in run_agent_analyses(client, project_info, cache_mode="bypass"):
+            pass
+        times.append(time.perf_counter() - start)
+    return summarize(times)
+
+
+def bench_ttft(client, project_info, repeat):
+    """Time-to-first-token and streamed total per role, cache bypassed"""
+    ttfts, totals = [], []
+    for _ in range(repeat):
+        timings = {}
+        start = time.perf_counter()
+        for _ in stream_agent_analyses(client, project_info, timings=timings, cache_mode="bypass"):
+            pass
+        totals.append(time.perf_counter() - start)
+        ttfts.extend(timing["ttft"] for timing in timings.values() if timing["ttft"] is not None)
+    return {"ttft": summarize(ttfts), "streamed_e2e": summarize(totals)}
+
+
+def bench_throughput(client, project_info, sessions, analyses_per_session):
+    """Concurrent sessions each running back-to-back analyses, cache bypassed"""
+    latencies = []
+    lock = threading.Lock()
+
+    def session():
+        for _ in range(analyses_per_session):
+            start = time.perf_counter()
+            for _ in run_agent_analyses(client, project_info, cache_mode="bypass"):
+                pass
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=session) for _ in range(sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {
+        "sessions": sessions,
+        "analyses": len(latencies),
+        "analyses_per_min": round(len(latencies) / elapsed * 60, 2),
+        "llm_calls_per_sec": round(len(latencies) * len(AGENT_ROLES) / elapsed, 2),
+        "latency": summarize(latencies)
+    }
+
+
+def bench_suggestions(server, reruns, edit_every):
+    """AI wizard calls per script rerun while a user works with the app
+
+    Reruns alternate between a sidebar toggle and an "Analyze" submit with a new
+    project name; every `edit_every`-th submit also changes the description,
+    which is the only edit that needs a new suggestion. Suggestion calls are
+    the mock's JSON-mode requests.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(APP_DIR, "agency.py"), default_timeout=120)
+    app.run()
+    app.sidebar.text_input[0].input("mock-key").run()
+    description = get_industry_templates()["SaaS Platform"]["description"]
+    before = server.json_count
+    submits = edits = 0
+    for rerun in range(reruns):
+        if rerun % 2:
+            diagnostics = [box for box in app.sidebar.checkbox if "latency diagnostics" in box.label][0]
+            diagnostics.check() if not diagnostics.value else diagnostics.uncheck()
+        else:
+            app.text_input[0].input(f"Project {rerun}")
+            if submits % edit_every == 0:
+                edits += 1
+                app.text_area[0].input(f"{description} Revision {edits}.")
+            submits += 1
+            [button for button in app.button if "Analyze" in str(button.label)][0].click()
+        app.run()
+    calls = server.json_count - before
+    return {
+        "reruns": reruns,
+        "submits": submits,
+        "description_edits": edits,
+        "suggestion_calls": calls,
+        "calls_per_rerun": round(calls / reruns, 3)
+    }
+
+
+def measure(func, repeat):
+    """(best seconds, tracemalloc peak bytes) of func() over `repeat` runs"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"seconds": round(best, 4), "peak_bytes": peak}
+
+
+def bench_exports(project_info, analysis_chars, portfolio_size, repeat):
+    """Quick exports of one project and a streamed portfolio PDF of many"""
+    answer = (MOCK_ANSWER * (analysis_chars // len(MOCK_ANSWER) + 1))[:analysis_chars]
+    analyses = {AGENT_DISPLAY[role]["label"]: answer for role in AGENT_ROLES}
+    results = {
+        "pdf": measure(lambda: export_to_pdf(project_info, analyses), repeat),
+        "markdown": measure(lambda: export_to_markdown(project_info, analyses), repeat),
+        "json": measure(lambda: export_to_json(project_info, analyses), repeat)
+    }
+    entries = [({**project_info, "name": f"Project {i}"}, analyses, []) for i in range(portfolio_size)]
+    portfolio_path = os.path.join(BENCH_DATA_DIR, "portfolio.pdf")
+    results["portfolio_pdf"] = measure(lambda: write_portfolio_report(portfolio_path, entries, "Benchmark"), 1)
+    results["portfolio_pdf"]["projects"] = portfolio_size
+    results["portfolio_pdf"]["file_bytes"] = os.path.getsize(portfolio_path)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=APP_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(results, prefix=""):
+    """{"a": {"b": 1}} -> {"a.b": 1}, numeric leaves only"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, dict) and "sessions" in item:
+                    flat.update(flatten(item, f"{name}.{item['sessions']}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(results, baseline):
+    """Print every metric present in both runs with its relative change"""
+    current, previous = flatten(results), flatten(baseline["results"])
+    print(f"\nAgainst baseline {baseline['meta'].get('git_revision')} ({baseline['meta'].get('timestamp')}):")
+    for name in sorted(current.keys() & previous.keys()):
+        old, new = previous[name], current[name]
+        change = f"{(new - old) / old * 100:+7.1f}%" if old else "    n/a"
+        print(f"  {name:<42} {old:>14,.4f} -> {new:>14,.4f}  {change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the agency benchmark suite against the mock server")
+    parser.add_argument("--latency", type=float, default=0.5, help="Injected seconds before each mock response")
+    parser.add_argument("--token-rate", type=float, default=0, help="Streamed tokens/sec per response (0 = unthrottled)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of mock requests failed")
+    parser.add_argument("--error-status", type=int, default=503, help="HTTP status of injected errors")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--analyses-per-session", type=int, default=2)
+    parser.add_argument("--reruns", type=int, default=20)
+    parser.add_argument("--edit-every", type=int, default=5)
+    parser.add_argument("--analysis-chars", type=int, default=6000)
+    parser.add_argument("--portfolio", type=int, default=50)
+    parser.add_argument("--skip", nargs="*", default=[],
+                        choices=["e2e", "ttft", "throughput", "suggestions", "exports"])
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+    token_delay = 1 / args.token_rate if args.token_rate else 0.0
+    server = start_mock_server(latency=args.latency, token_delay=token_delay, error_rate=args.error_rate,
+                               error_status=args.error_status, seed=args.seed)
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    # The app's pooled client, with retries left to the request scheduler
+    client = get_openai_client("mock-key", server.base_url)
+    project_info = build_project_info()
+
+    results = {}
+    started = time.perf_counter()
+    if "e2e" not in args.skip:
+        print("e2e analysis latency...")
+        results["e2e"] = bench_e2e(client, project_info, args.repeat)
+    if "ttft" not in args.skip:
+        print("time-to-first-token...")
+        results["streaming"] = bench_ttft(client, project_info, args.repeat)
+    if "throughput" not in args.skip:
+        results["throughput"] = []
+        for sessions in args.sessions:
+            print(f"throughput with {sessions} concurrent sessions...")
+            results["throughput"].append(bench_throughput(client, project_info, sessions, args.analyses_per_session))
+    if "suggestions" not in args.skip:
+        print("suggestion calls per rerun...")
+        results["suggestions"] = bench_suggestions(server, args.reruns, args.edit_every)
+    if "exports" not in args.skip:
+        print("exports...")
+        results["exports"] = bench_exports(project_info, args.analysis_chars, args.portfolio, args.repeat)
+
+    usage = get_llm_telemetry().summary()
+    results["llm"] = {
+        "calls": usage["calls"],
+        "retries": usage["retries"],
+        "errors": usage["errors"],
+        "injected_errors": server.error_count,
+        "mock_requests": server.request_count
+    }
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results["process"] = {
+        "max_rss_bytes": max_rss if sys.platform == "darwin" else max_rss * 1024,
+        "wall_seconds": round(time.perf_counter() - started, 2)
+    }
+    server.shutdown()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")}
+        },
+        "results": results
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps(results, indent=2))
+    print(f"\nResults written to {args.output}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
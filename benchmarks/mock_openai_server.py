@@ -0,0 +1,218 @@
+"""Local OpenAI-compatible stand-in server for benchmarks
+
+Serves POST /v1/chat/completions with canned answers after an injected delay,
+so the agency can be timed without network access or API spend. Requests with
+"stream": true are answered as server-sent events, one word per chunk. A
+seeded fraction of requests can be failed with a 429 or 5xx to exercise the
+retry path.
+
+Run standalone:
+    python benchmarks/mock_openai_server.py --port 8765 --latency 2.0 --token-delay 0.01 --error-rate 0.05
+then point the app at it with OPENAI_BASE_URL=http://127.0.0.1:8765/v1
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MOCK_ANSWER = (
+    "## Mock Analysis\n\n"
+    "1. Feasibility: the project is feasible within the stated budget.\n"
+    "2. Risks: scope creep, integration delays and hiring.\n"
+    "3. Recommendation: start with a focused MVP and iterate.\n"
+)
+
+MOCK_JSON_ANSWER = '{"type": "Web Application", "budget": "$50k-$100k"}'
+
+
+def mock_usage(request, answer):
+    """Token usage for a request and answer, counting words as tokens"""
+    prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in request.get("messages", []))
+    completion_tokens = len(answer.split())
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens
+    }
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    """Request handler answering chat completion calls"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream_completion(self, request):
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = request.get("model", "gpt-4o-mini")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        words = MOCK_ANSWER.split(" ")
+        for idx, word in enumerate(words):
+            delta = {"content": word if idx == 0 else " " + word}
+            if idx == 0:
+                delta["role"] = "assistant"
+            self._send_event({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": None}]
+            })
+            time.sleep(self.server.token_delay)
+        self._send_event({
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+        })
+        if (request.get("stream_options") or {}).get("include_usage"):
+            self._send_event({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [],
+                "usage": mock_usage(request, MOCK_ANSWER)
+            })
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _send_event(self, payload):
+        self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+
+        self.server.record_request(request)
+        time.sleep(self.server.latency)
+
+        if self.server.should_fail():
+            headers = {"retry-after-ms": "50"} if self.server.error_status == 429 else {}
+            self._send_json(self.server.error_status,
+                            {"error": {"message": "Injected mock error", "type": "mock_error"}}, headers)
+            return
+
+        if request.get("stream"):
+            self._stream_completion(request)
+            return
+
+        if (request.get("response_format") or {}).get("type") == "json_object":
+            answer = MOCK_JSON_ANSWER
+        else:
+            answer = MOCK_ANSWER
+        self._send_json(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "gpt-4o-mini"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": answer},
+                "finish_reason": "stop"
+            }],
+            "usage": mock_usage(request, answer)
+        })
+
+
+class MockOpenAIServer(ThreadingHTTPServer):
+    """Threaded HTTP server that counts requests and injects per-call latency and errors"""
+
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.5, token_delay=0.0, error_rate=0.0, error_status=503, seed=0):
+        super().__init__(address, MockOpenAIHandler)
+        self.latency = latency
+        self.token_delay = token_delay
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.request_count = 0
+        self.stream_count = 0
+        self.json_count = 0
+        self.error_count = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def record_request(self, request):
+        with self._lock:
+            self.request_count += 1
+            if request.get("stream"):
+                self.stream_count += 1
+            if (request.get("response_format") or {}).get("type") == "json_object":
+                self.json_count += 1
+
+    def should_fail(self):
+        """Decide, reproducibly for a given seed and request order, whether to inject an error"""
+        with self._lock:
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.error_count += 1
+                return True
+            return False
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+def start_mock_server(latency=0.5, token_delay=0.0, host="127.0.0.1", port=0, error_rate=0.0, error_status=503,
+                      seed=0):
+    """Start the mock server on a background thread and return it"""
+    server = MockOpenAIServer((host, port), latency=latency, token_delay=token_delay, error_rate=error_rate,
+                              error_status=error_status, seed=seed)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local OpenAI-compatible mock server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds to wait before each response")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds between streamed chunks")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with an error")
+    parser.add_argument("--error-status", type=int, default=503, help="HTTP status of injected errors (429 or 5xx)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = MockOpenAIServer((args.host, args.port), latency=args.latency, token_delay=args.token_delay,
+                              error_rate=args.error_rate, error_status=args.error_status, seed=args.seed)
+    print(f"Mock OpenAI server listening on {server.base_url} (latency {args.latency}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""Background export jobs for full PDF reports
+
+Complete (untruncated) PDF reports, with the dashboard charts rendered through
+kaleido, are built in a process pool so the Streamlit script thread never
+blocks on layout or image rendering. A job covers one project or a batch of
+history entries; batches are streamed into a single portfolio PDF by one
+worker that renders each entry's charts just before laying it out.
+
+The worker entry points live in this module rather than in agency.py because
+Streamlit runs agency.py as __main__, and worker processes cannot import
+functions from another process's __main__.
+"""
+import multiprocessing
+import os
+import queue
+import re
+import shutil
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+CHARTS_SKIPPED_NOTE = "Charts skipped: static image export (kaleido) is unavailable"
+
+
+def render_chart_job(kind, project_info):
+    """Worker: render one report chart to JPEG bytes (None when kaleido cannot render)"""
+    import agency
+    return agency.render_report_chart(kind, project_info)
+
+
+def write_report_job(path, project_info, analyses, chart_images):
+    """Worker: lay out and write one PDF report"""
+    import agency
+    return agency.write_pdf_report(path, project_info, analyses, chart_images)
+
+
+def render_entry_charts(project_info, chart_kinds, progress):
+    """(title, JPEG bytes) of one entry's charts, reporting each as rendered (True) or skipped (False)"""
+    import agency
+    chart_images = []
+    for kind, title in chart_kinds:
+        image = agency.render_report_chart(kind, project_info)
+        progress.put(image is not None)
+        if image:
+            chart_images.append((title, image))
+    return chart_images
+
+
+def write_portfolio_job(path, entries, title, chart_kinds, progress):
+    """Worker: lay out and write one portfolio PDF of (project_info, analyses) entries
+
+    Only the entry being laid out has its chart images in memory.
+    """
+    import agency
+    return agency.write_portfolio_report(
+        path,
+        ((project_info, analyses, render_entry_charts(project_info, chart_kinds, progress))
+         for project_info, analyses in entries),
+        title
+    )
+
+
+class ExportJob:
+    """Status and progress of one background export"""
+
+    def __init__(self, label, total_steps, owner=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.owner = owner
+        self.status = "queued"
+        self.total_steps = total_steps
+        self.done_steps = 0
+        self.path = None
+        self.error = None
+        self.notes = []
+        self.created_at = time.time()
+        self.finished_at = None
+
+    @property
+    def progress(self):
+        return self.done_steps / self.total_steps if self.total_steps else 1.0
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed")
+
+
+class ExportJobManager:
+    """Runs full PDF report exports in a process pool and keeps finished artifacts for download"""
+
+    def __init__(self, output_dir, workers=2, chart_kinds=None, max_jobs=20):
+        self.output_dir = output_dir
+        self.workers = workers
+        self.chart_kinds = chart_kinds or []
+        self.max_jobs = max_jobs
+        self._executor = None
+        self._manager = None
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(output_dir, exist_ok=True)
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                # Spawned workers inherit sys.path and must be able to import this module and agency
+                app_dir = os.path.dirname(os.path.abspath(__file__))
+                if app_dir not in sys.path:
+                    sys.path.append(app_dir)
+                # spawn keeps worker processes clear of the Streamlit server's threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def _progress_queue(self):
+        """A queue worker processes can report chart progress on"""
+        with self._lock:
+            if self._manager is None:
+                self._manager = multiprocessing.get_context("spawn").Manager()
+            return self._manager.Queue()
+
+    def submit(self, entries, label, owner=None):
+        """Queue an export of (project_info, analyses) entries and return the job id"""
+        entries = list(entries)
+        job = ExportJob(label, len(entries) * len(self.chart_kinds) + 1, owner)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._prune()
+        threading.Thread(target=self._run, args=(job, entries), daemon=True).start()
+        return job.id
+
+    def _advance(self, job):
+        with self._lock:
+            job.done_steps += 1
+
+    def _chart_done(self, job, rendered):
+        self._advance(job)
+        if not rendered and CHARTS_SKIPPED_NOTE not in job.notes:
+            job.notes.append(CHARTS_SKIPPED_NOTE)
+
+    def _run(self, job, entries):
+        job.status = "running"
+        job_dir = os.path.join(self.output_dir, job.id)
+        os.makedirs(job_dir, exist_ok=True)
+        try:
+            pool = self._pool()
+            if len(entries) == 1:
+                # Render the project's charts at once, then lay out the report
+                project_info, analyses = entries[0]
+                futures = [(title, pool.submit(render_chart_job, kind, project_info))
+                           for kind, title in self.chart_kinds]
+                chart_images = []
+                for title, future in futures:
+                    image = future.result()
+                    self._chart_done(job, image is not None)
+                    if image:
+                        chart_images.append((title, image))
+                name = re.sub(r"[^A-Za-z0-9]+", "_", project_info["name"]).strip("_") or "project"
+                path = os.path.join(job_dir, f"{name}_analysis.pdf")
+                job.path = pool.submit(write_report_job, path, project_info, analyses, chart_images).result()
+            else:
+                # One worker renders and lays out entry by entry, so no full set of chart images is built
+                path = os.path.join(job_dir, "portfolio_report.pdf")
+                progress = self._progress_queue()
+                future = pool.submit(write_portfolio_job, path, entries, job.label, self.chart_kinds, progress)
+                while not (future.done() and progress.empty()):
+                    try:
+                        self._chart_done(job, progress.get(timeout=0.2))
+                    except queue.Empty:
+                        pass
+                job.path = future.result()
+            self._advance(job)
+            job.status = "done"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+
+    def _prune(self):
+        """Drop each owner's oldest finished jobs and their files beyond max_jobs"""
+        with self._lock:
+            stale = []
+            for owner in {job.owner for job in self._jobs.values()}:
+                owned = [job for job in self._jobs.values() if job.owner == owner]
+                finished = [job for job in owned if job.finished]
+                stale += finished[:max(0, len(owned) - self.max_jobs)]
+            for job in stale:
+                del self._jobs[job.id]
+        for job in stale:
+            shutil.rmtree(os.path.join(self.output_dir, job.id), ignore_errors=True)
+
+    def jobs(self, owner=None):
+        """Tracked jobs newest first, all of them or only one owner's"""
+        with self._lock:
+            return [job for job in reversed(self._jobs.values()) if owner is None or job.owner == owner]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def read_artifact(self, job_id):
+        """The finished report's bytes, or None once the job is pruned or while it is still running"""
+        job = self.get(job_id)
+        if job is None or job.status != "done":
+            return None
+        try:
+            with open(job.path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            # Pruned between the lookup and the read
+            return None
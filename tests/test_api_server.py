@@ -0,0 +1,188 @@
+"""REST API tests against benchmarks/mock_openai_server.py, without network or API spend
+
+    python -m pytest tests
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+# The engine reads its data and cache locations at import time
+DATA_DIR = tempfile.mkdtemp(prefix="agency-api-test-")
+os.environ["AGENCY_DATA_DIR"] = DATA_DIR
+os.environ["AGENCY_CACHE_PATH"] = os.path.join(DATA_DIR, "responses.sqlite3")
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+sys.path.insert(0, os.path.join(APP_DIR, "benchmarks"))
+
+import pytest
+from starlette.testclient import TestClient
+
+from agency import AGENT_ROLES
+from api_server import create_app
+from mock_openai_server import start_mock_server
+
+KEY_A = {"Authorization": "Bearer key-a"}
+KEY_B = {"Authorization": "Bearer key-b"}
+PROJECT = {
+    "name": "Clinic Booking",
+    "description": "Online appointment booking and reminders for a chain of dental clinics",
+    "type": "Web Application",
+    "budget": "$50k-$100k",
+    "timeline": "3-4 months",
+    "priority": "High"
+}
+
+
+@pytest.fixture(scope="module")
+def mock():
+    server = start_mock_server(latency=0.01, token_delay=0.001)
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture(scope="module")
+def client(mock):
+    with TestClient(create_app(None, mock.base_url)) as client:
+        yield client
+
+
+@pytest.fixture(scope="module")
+def finished_job(client):
+    """An analysis job for key A, polled until it finishes"""
+    response = client.post("/analyses", json={"project_info": PROJECT}, headers=KEY_A)
+    assert response.status_code == 202
+    job = response.json()
+    for _ in range(300):
+        job = client.get(f"/analyses/{job['id']}", headers=KEY_A).json()
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.05)
+    pytest.fail(f"Analysis {job['id']} did not finish")
+
+
+def read_events(response):
+    """(event, data) pairs of a server-sent event stream"""
+    events, event = [], None
+    for line in response.iter_lines():
+        if line.startswith("event: "):
+            event = line[len("event: "):]
+        elif line.startswith("data: "):
+            events.append((event, json.loads(line[len("data: "):])))
+    return events
+
+
+def test_health_and_templates(client):
+    assert client.get("/health").json() == {"status": "ok"}
+    assert client.get("/templates").json()
+
+
+def test_score_single_and_batch(client):
+    single = client.post("/score", json={"project_info": PROJECT}).json()
+    batch = client.post("/score", json={"projects": [PROJECT, dict(PROJECT, budget="$10k-$25k")]}).json()
+    assert len(batch["scores"]) == 2
+    assert batch["scores"][0]["total_score"] == single["total_score"]
+
+
+@pytest.mark.parametrize("body", [
+    {"project_info": {"name": "No description"}},
+    {"projects": [PROJECT, {"name": "No description"}]},
+    {"projects": [PROJECT, "not an object"]}
+])
+def test_score_validates_projects(client, body):
+    response = client.post("/score", json=body)
+    assert response.status_code == 422
+    assert "error" in response.json()
+
+
+def test_analysis_requires_key(client):
+    assert client.post("/analyses", json={"project_info": PROJECT}).status_code == 401
+
+
+@pytest.mark.parametrize("roles", [["nobody"], [{"a": 1}], "ceo"])
+def test_analysis_validates_roles(client, roles):
+    response = client.post("/analyses", json={"project_info": PROJECT, "roles": roles}, headers=KEY_A)
+    assert response.status_code == 422
+
+
+def test_analysis_polling(client, finished_job):
+    assert finished_job["status"] == "done"
+    assert len(finished_job["analyses"]) == len(AGENT_ROLES)
+    assert not finished_job["errors"]
+
+
+def test_repeat_analysis_uses_response_cache(client, mock, finished_job):
+    before = mock.request_count
+    again = client.post("/analyses", json={"project_info": PROJECT}, headers=KEY_A).json()
+    with client.stream("GET", f"/analyses/{again['id']}/events", headers=KEY_A) as response:
+        events = read_events(response)
+    assert events[-1][1]["analyses"] == finished_job["analyses"]
+    assert mock.request_count == before
+
+
+def test_analysis_is_private_to_its_key(client, finished_job):
+    assert client.get(f"/analyses/{finished_job['id']}", headers=KEY_B).status_code == 404
+    assert client.get(f"/analyses/{finished_job['id']}/events", headers=KEY_B).status_code == 404
+    assert client.post("/exports/md", json={"analysis_id": finished_job["id"]}, headers=KEY_B).status_code == 404
+
+
+def test_events_replay_after_finish(client, finished_job):
+    with client.stream("GET", f"/analyses/{finished_job['id']}/events", headers=KEY_A) as response:
+        events = read_events(response)
+    assert events[-1][0] == "done"
+    assert events[-1][1]["analyses"] == finished_job["analyses"]
+
+
+def test_streamed_analysis(client, mock):
+    body = {"project_info": dict(PROJECT, name="Streamed"), "roles": ["ceo", "cto"], "stream": True}
+    before = mock.request_count
+    with client.stream("POST", "/analyses", json=body, headers=KEY_A) as response:
+        events = read_events(response)
+    names = [event for event, _ in events]
+    assert "chunk" in names
+    assert names.count("role_done") == 2
+    assert names[-1] == "done"
+    assert mock.request_count - before == 2
+
+
+def test_chat_keeps_conversation(client, finished_job):
+    first = client.post("/chat", json={"role": "ceo", "question": "Biggest risk?",
+                                       "analysis_id": finished_job["id"]}, headers=KEY_A).json()
+    assert first["answer"]
+    second = client.post("/chat", json={"role": "ceo", "question": "And the next one?",
+                                        "analysis_id": finished_job["id"],
+                                        "conversation_id": first["conversation_id"]}, headers=KEY_A).json()
+    assert second["conversation_id"] == first["conversation_id"]
+
+
+def test_streamed_chat(client):
+    body = {"role": "cto", "question": "Which stack?", "project_info": PROJECT, "stream": True}
+    with client.stream("POST", "/chat", json=body, headers=KEY_A) as response:
+        events = read_events(response)
+    assert events[-1][0] == "done"
+    assert events[-1][1]["answer"] == "".join(data["text"] for event, data in events if event == "chunk")
+
+
+@pytest.mark.parametrize("kind, media_type", [
+    ("md", "text/markdown"),
+    ("json", "application/json"),
+    ("pdf", "application/pdf")
+])
+def test_export_of_analysis(client, finished_job, kind, media_type):
+    response = client.post(f"/exports/{kind}", json={"analysis_id": finished_job["id"]}, headers=KEY_A)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith(media_type)
+    assert response.headers["content-disposition"].endswith(f'_analysis.{kind}"')
+    assert response.content
+
+
+def test_export_of_posted_analyses(client):
+    body = {"project_info": PROJECT, "analyses": {"CEO": "Go ahead"}}
+    response = client.post("/exports/json", json=body)
+    assert response.json()["analyses"] == {"CEO": "Go ahead"}
+    # Nothing generated per request, so the export is stable and served from the export cache
+    assert "timestamp" not in response.json()["project_info"]
+    assert client.post("/exports/json", json=body).content == response.content
+    assert client.post("/exports/docx", json={}).status_code == 404
@@ -0,0 +1,62 @@
+"""The vectorized batch scorer must match calculate_success_score row for row, for any input"""
+import os
+import sys
+import tempfile
+
+# The engine reads its data and cache locations at import time
+DATA_DIR = tempfile.mkdtemp(prefix="agency-scoring-test-")
+os.environ["AGENCY_DATA_DIR"] = DATA_DIR
+os.environ["AGENCY_CACHE_PATH"] = os.path.join(DATA_DIR, "responses.sqlite3")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from agency import calculate_success_score, get_scoring_rules, score_projects_batch
+
+PROJECT = {
+    "name": "Clinic Booking",
+    "description": "Online appointment booking and reminders for a chain of dental clinics",
+    "type": "Web Application",
+    "budget": "$50k-$100k",
+    "timeline": "3-4 months",
+    "priority": "High"
+}
+FIELDS = ["budget", "timeline", "priority", "type", "description"]
+
+
+def assert_paths_agree(projects):
+    rules = get_scoring_rules()
+    batch = score_projects_batch(pd.DataFrame(projects), rules)
+    for project_info, (_, row) in zip(projects, batch.iterrows()):
+        scalar = calculate_success_score(project_info, rules)
+        assert int(row["total_score"]) == scalar["total_score"], project_info
+        assert str(row["level"]) == scalar["level"], project_info
+        for name, data in scalar["breakdown"].items():
+            assert int(row[name]) == data["score"], (project_info, name)
+
+
+@pytest.mark.parametrize("missing", [None, np.nan, pd.NA])
+@pytest.mark.parametrize("field", FIELDS)
+def test_missing_values_score_alike(field, missing):
+    assert_paths_agree([PROJECT, dict(PROJECT, **{field: missing})])
+
+
+@pytest.mark.parametrize("field", FIELDS)
+def test_absent_fields_score_like_missing_values(field):
+    absent = {key: value for key, value in PROJECT.items() if key != field}
+    assert_paths_agree([PROJECT, absent, dict(PROJECT, **{field: None})])
+    assert calculate_success_score(absent) == calculate_success_score(dict(PROJECT, **{field: None}))
+
+
+def test_every_field_missing():
+    assert_paths_agree([{field: None for field in FIELDS}, {field: np.nan for field in FIELDS}])
+
+
+def test_unexpected_values():
+    assert_paths_agree([
+        dict(PROJECT, budget="about $30k", timeline="6+ months, maybe", priority="Urgent", type="Other"),
+        dict(PROJECT, budget=5, timeline=3.5, priority=1, description=42)
+    ])